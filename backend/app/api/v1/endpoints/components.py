@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, Dict, List
+from typing import List, Optional
 
+from app.core.responses import REVALIDATE, ORJSONResponse, etag_matches, not_modified
 from app.db.session import get_db
 from app.schemas.component import ComponentCreate, ComponentResponse
 from app.services import component_service
+from app.services.component_catalog import component_catalog
 
 router = APIRouter()
 
@@ -17,15 +18,36 @@ async def create_component(
     return await component_service.create_component(db, payload)
 
 
+# Reads are served from the in-memory catalog; entries are already
+# ComponentResponse-shaped, so they are returned without re-validation.
+# The catalog ETag covers every component: a 304 means nothing changed.
 @router.get("/", response_model=List[ComponentResponse])
-async def list_components(db: AsyncSession = Depends(get_db)):
-    components = await component_service.get_all_components(db)
-    return components
+async def list_components(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    catalog = await component_catalog.ensure_loaded(db)
+    if etag_matches(if_none_match, catalog.etag):
+        return not_modified(catalog.etag)
+    return ORJSONResponse(
+        catalog.list_active(),
+        headers={"ETag": catalog.etag, "Cache-Control": REVALIDATE},
+    )
 
 
 @router.get("/{component_type}", response_model=ComponentResponse)
-async def get_component(component_type: str, db: AsyncSession = Depends(get_db)):
-    component = await component_service.get_component_by_type(db, component_type)
+async def get_component(
+    component_type: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    catalog = await component_catalog.ensure_loaded(db)
+    component = catalog.get(component_type)
     if not component:
         raise HTTPException(status_code=404, detail="Component not found")
-    return component
+    if etag_matches(if_none_match, catalog.etag):
+        return not_modified(catalog.etag)
+    return ORJSONResponse(
+        component,
+        headers={"ETag": catalog.etag, "Cache-Control": REVALIDATE},
+    )
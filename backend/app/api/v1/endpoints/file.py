@@ -1,13 +1,16 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 from app.db.session import get_db
+from app.llm_models.vector_store import RetrievalResources, get_retrieval_resources
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.file_service import (
+    UploadTooLargeError,
     save_uploaded_file,
     delete_file,
     get_file_list,
+    get_ingestion_status,
 )
 
 router = APIRouter()
@@ -21,6 +24,8 @@ class FileUploadResponse(BaseModel):
     size: int
     content_type: str
     workflow_id: int = None
+    content_hash: Optional[str] = None
+    deduplicated: bool = False  # True if identical content was already uploaded
     status: str
 
 
@@ -33,6 +38,11 @@ class FileListResponse(BaseModel):
     files: List[dict]
 
 
+class IngestionStatusResponse(BaseModel):
+    workflow_id: int
+    files: List[dict]
+
+
 # --- Upload File Endpoint ---
 @router.post("/upload", response_model=FileUploadResponse)
 async def upload_file(
@@ -43,6 +53,8 @@ async def upload_file(
     """
     Upload a file to the user_files folder and save metadata to database.
     workflow_id is required - files are associated with a workflow from upload.
+    Files larger than settings.UPLOAD_MAX_BYTES are rejected with 413
+    (request bodies over settings.REQUEST_MAX_BYTES before they are spooled).
     """
     try:
         result = await save_uploaded_file(db, file, workflow_id)
@@ -50,6 +62,8 @@ async def upload_file(
             return result
         else:
             raise HTTPException(status_code=500, detail=result["message"])
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
@@ -59,12 +73,13 @@ async def upload_file(
 async def delete_uploaded_file(
     file_id: int,
     db: AsyncSession = Depends(get_db),
+    resources: RetrievalResources = Depends(get_retrieval_resources),
 ):
     """
     Delete a file from user_files folder and database.
     """
     try:
-        result = await delete_file(db, file_id)
+        result = await delete_file(db, file_id, resources)
         if result["status"] == "success":
             return result
         else:
@@ -87,3 +102,19 @@ async def list_files(
         return {"files": files}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
+
+
+# --- Ingestion Status Endpoint ---
+@router.get("/status", response_model=IngestionStatusResponse)
+async def ingestion_status(
+    workflow_id: int,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Ingestion job status/progress for each file of a workflow.
+    """
+    try:
+        files = await get_ingestion_status(db, workflow_id)
+        return {"workflow_id": workflow_id, "files": files}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
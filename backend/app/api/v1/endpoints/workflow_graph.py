@@ -1,25 +1,63 @@
 # app/api/workflow_graph.py
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.responses import REVALIDATE, ORJSONResponse, etag_matches, not_modified
 from app.db.session import get_db
 from app.schemas.workflow_graph import WorkflowGraphResponse
 from app.schemas.workflow_graph import WorkflowGraphSaveRequest
+from app.schemas.workflow_graph import (
+    WorkflowGraphDeltaRequest,
+    WorkflowGraphDeltaResponse,
+)
 from app.services.workflow_graph_service import get_workflow_graph
+from app.services.workflow_graph_service import get_workflow_graph_version, graph_etag
 from app.services.workflow_graph_service import save_workflow_graph
+from app.services.workflow_graph_service import (
+    GraphVersionConflictError,
+    apply_workflow_graph_delta,
+)
 
 router = APIRouter()
 
 
+# The service builds the graph from stored flow_json and catalog entries,
+# both already JSON-shaped, so it is rendered directly: validating a large
+# graph through the response model cost more than the encoding it saved.
+# response_model only documents the shape.
 @router.get("/{workflow_id}/graph", response_model=WorkflowGraphResponse)
 async def get_workflow_graph_api(
     workflow_id: int,
+    format: Literal["full", "compact"] = Query("full"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await get_workflow_graph(db, workflow_id)
+    """
+    Enriched graph with an ETag (graph_version + component catalog).
+    Revalidating with If-None-Match costs one single-column query and
+    returns 304 if nothing changed. The ETag stays strong when the response
+    is compressed ("...-gzip" / "...-br"). format=compact lists component
+    definitions once under "components" instead of inside every node.
+    """
+    compact = format == "compact"
+    if if_none_match:
+        version = await get_workflow_graph_version(db, workflow_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        etag = await graph_etag(db, version, compact)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    result = await get_workflow_graph(db, workflow_id, compact)
     if not result:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return result
+    # ETag of the version actually loaded (a save may have landed in between)
+    etag = await graph_etag(db, result["workflow"]["graph_version"], compact)
+    return ORJSONResponse(
+        result, headers={"ETag": etag, "Cache-Control": REVALIDATE}
+    )
 
 @router.patch("/{workflow_id}")
 async def save_workflow_graph_api(
@@ -28,8 +66,33 @@ async def save_workflow_graph_api(
     db: AsyncSession = Depends(get_db),
 ):
     try:
-        await save_workflow_graph(db, workflow_id, payload)
-        return {"status": "saved"}
+        graph_version = await save_workflow_graph(db, workflow_id, payload)
+        return {"status": "saved", "graph_version": graph_version}
+    except GraphVersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.patch("/{workflow_id}/delta", response_model=WorkflowGraphDeltaResponse)
+async def save_workflow_graph_delta_api(
+    workflow_id: int,
+    payload: WorkflowGraphDeltaRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Incremental save for autosave: only the changed nodes/edges are sent and
+    written. 409 if the graph changed since base_version (reload and retry).
+    """
+    try:
+        graph_version = await apply_workflow_graph_delta(db, workflow_id, payload)
+        return {
+            "workflow_id": workflow_id,
+            "graph_version": graph_version,
+            "status": "saved",
+        }
+    except GraphVersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1,31 +1,56 @@
+import logging
+
+import orjson
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Any, Dict, List, Optional
-from datetime import datetime
 
 from app.db.session import get_db
-from app.schemas.workflow import WorkflowResponse, WorkflowCreate
+from app.schemas.workflow import (
+    WorkflowResponse,
+    WorkflowCreate,
+    WorkflowEmbeddingProviderUpdate,
+)
 from app.schemas.workflow_graph import (
     WorkflowGraphSaveRequest,
     WorkflowGraphSaveResponse,
 )
 from app.services.workflow_service import (
     create_empty_workflow,
+    delete_workflow,
     get_workflow,
     get_all_workflows,
+    get_compiled_workflow_graph,
     run_workflow as run_workflow_service,
+    run_workflow_batch,
+    set_embedding_provider,
+    stream_workflow,
 )
 from app.services.workflow_graph_service import save_workflow_graph
-from app.services.document_ingest_service import ingest_pdf_to_vector_db
+from app.services.run_history_service import get_run, get_runs
+from app.schemas.workflow_run import (
+    WorkflowRunDetail,
+    WorkflowRunResult,
+    WorkflowRunSummary,
+)
+from app.services.ingestion_queue import IngestionQueue, get_ingestion_queue
 from app.models.file import File
+from app.llm_models.vector_store import RetrievalResources, get_retrieval_resources
 
 from app.workflow.builder import build_graph_from_frontend
 from app.workflow.validator import GraphValidationError
 from app.workflow.validator import validate_graph
+from app.workflow.graph_cache import graph_cache
+from app.llm_models.response_cache import response_cache
+from app.llm_models.embedding_cache import embedding_cache
+from config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # --- Schemas ---
@@ -34,6 +59,12 @@ class RunGraphRequest(BaseModel):
     message: str  # The user's question
 
 
+class BatchRunRequest(BaseModel):
+    workflow_id: int
+    messages: List[str]
+    concurrency: Optional[int] = None  # Defaults to settings.BATCH_RUN_CONCURRENCY
+
+
 class WorkflowBuildRequest(BaseModel):
     nodes: List[Dict[str, Any]]
     edges: List[Dict[str, Any]]
@@ -43,15 +74,19 @@ class WorkflowBuildRequest(BaseModel):
 class WorkflowBuildResponse(BaseModel):
     status: str
     message: str
+    queued_file_ids: List[int] = []  # Ingestion jobs started by this build
 
 
 # --- The NEW Build Endpoint ---
 @router.post("/build", response_model=WorkflowBuildResponse)
 async def build_workflow(
-    payload: WorkflowBuildRequest, db: AsyncSession = Depends(get_db)
+    payload: WorkflowBuildRequest,
+    db: AsyncSession = Depends(get_db),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
 ):
     """
-    Validates the graph structure AND ingests documents to vector DB.
+    Validates the graph structure AND queues document ingestion to vector DB.
+    Ingestion runs in the background; poll GET /file/status for progress.
     """
     try:
         # 1. Run Validation Logic
@@ -63,23 +98,15 @@ async def build_workflow(
         result = await db.execute(stmt)
         files = result.scalars().all()
 
-        for file in files:
-            if not file.is_ingested:  # Only ingest if not already done
-                try:
-                    await ingest_pdf_to_vector_db(file.filepath, file.filename)
-                    # Update file record
-                    file.is_ingested = True
-                    file.ingested_at = datetime.utcnow()
-                    db.add(file)
-                except Exception as ingest_error:
-                    print(
-                        f"Warning: Failed to ingest {file.filename}: {str(ingest_error)}"
-                    )
-
-        await db.commit()
+        # Only files not yet ingested (or already queued) become jobs
+        queued_file_ids = await ingestion_queue.enqueue(db, files)
 
         # 3. Return Success
-        return {"status": "valid", "message": "Build Successful"}
+        return {
+            "status": "valid",
+            "message": "Build Successful",
+            "queued_file_ids": queued_file_ids,
+        }
 
     except GraphValidationError as e:
         # 4. Return Logic Error (400 Bad Request)
@@ -90,38 +117,164 @@ async def build_workflow(
         raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
 
 
-@router.post("/run")
-async def run_workflow(payload: RunGraphRequest, db: AsyncSession = Depends(get_db)):
+@router.post("/run", response_model=WorkflowRunResult)
+async def run_workflow(
+    payload: RunGraphRequest,
+    db: AsyncSession = Depends(get_db),
+    resources: RetrievalResources = Depends(get_retrieval_resources),
+):
     """
     Run a workflow with the specified workflow_id and user message.
     Fetches the saved workflow graph from DB and executes it.
     """
     try:
         # 1. Call the workflow service to run the workflow
-        result = await run_workflow_service(db, payload.workflow_id, payload.message)
+        result, run_id = await run_workflow_service(
+            db, payload.workflow_id, payload.message, resources
+        )
 
-        # 2. Return Result
-        return {"response": result}
+        # 2. Return Result (run_id -> GET /workflows/{id}/runs/{run_id})
+        return {"response": result, "run_id": run_id}
 
     except ValueError as e:
         # Workflow not found or invalid
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        import traceback
-
-        traceback.print_exc()
+        logger.exception("Workflow run failed", extra={"workflow_id": payload.workflow_id})
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+@router.post("/run/stream")
+async def run_workflow_stream(
+    payload: RunGraphRequest,
+    db: AsyncSession = Depends(get_db),
+    resources: RetrievalResources = Depends(get_retrieval_resources),
+):
+    """
+    Streaming variant of /run (Server-Sent Events).
+    Emits node_start / node_end per node, token events as the LLM generates,
+    then a final event with the full response.
+    """
+    # Load/compile up front so a missing workflow is a normal 404,
+    # and the stream itself never needs the DB session.
+    try:
+        app_graph = await get_compiled_workflow_graph(db, payload.workflow_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def event_stream():
+        try:
+            async for event, data in stream_workflow(
+                app_graph, payload.workflow_id, payload.message, resources
+            ):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/run/batch")
+async def run_workflow_batch_api(
+    payload: BatchRunRequest,
+    db: AsyncSession = Depends(get_db),
+    resources: RetrievalResources = Depends(get_retrieval_resources),
+):
+    """
+    Run many messages against one workflow.
+    The graph is loaded/compiled once; results stream back as NDJSON
+    (one JSON object per line) in the same order as the input messages.
+    """
+    try:
+        app_graph = await get_compiled_workflow_graph(db, payload.workflow_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Queries are pre-embedded with the same model the workflow ingested with
+    workflow = await get_workflow(db, payload.workflow_id)
+
+    concurrency = payload.concurrency or settings.BATCH_RUN_CONCURRENCY
+    concurrency = max(1, min(concurrency, settings.BATCH_RUN_MAX_CONCURRENCY))
+
+    async def result_stream():
+        try:
+            async for result in run_workflow_batch(
+                app_graph,
+                payload.workflow_id,
+                payload.messages,
+                resources,
+                concurrency,
+                workflow.embedding_provider,
+            ):
+                yield orjson.dumps(result) + b"\n"
+        except Exception as e:
+            yield orjson.dumps({"error": str(e)}) + b"\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss/eviction counters for the in-memory caches (used for sizing).
+    """
+    return {
+        "graph_cache": graph_cache.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "embedding_cache": embedding_cache.stats(),
+    }
+
+
 @router.post("/")
 async def create_workflow(
     payload: WorkflowCreate,
     db: AsyncSession = Depends(get_db),
 ):
-    workflow_id = await create_empty_workflow(db, payload.name, payload.description)
+    try:
+        workflow_id = await create_empty_workflow(
+            db, payload.name, payload.description, payload.embedding_provider
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"workflow_id": workflow_id, "status": "created"}
 
 
+@router.put("/{workflow_id}/embedding-provider")
+async def update_embedding_provider(
+    workflow_id: int,
+    payload: WorkflowEmbeddingProviderUpdate,
+    db: AsyncSession = Depends(get_db),
+    resources: RetrievalResources = Depends(get_retrieval_resources),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
+):
+    """
+    Change the workflow's embedding provider and re-ingest its documents
+    with the new model (in the background, see GET /file/status).
+    """
+    try:
+        files = await set_embedding_provider(
+            db, workflow_id, payload.embedding_provider, resources
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if files is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    queued_file_ids = await ingestion_queue.enqueue(db, files)
+    return {
+        "workflow_id": workflow_id,
+        "embedding_provider": payload.embedding_provider,
+        "queued_file_ids": queued_file_ids,
+    }
+
+
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def read_workflow(workflow_id: int, db: AsyncSession = Depends(get_db)):
     db_workflow = await get_workflow(db, workflow_id)
@@ -130,6 +283,47 @@ async def read_workflow(workflow_id: int, db: AsyncSession = Depends(get_db)):
     return db_workflow
 
 
+@router.get("/{workflow_id}/runs", response_model=List[WorkflowRunSummary])
+async def read_workflow_runs(
+    workflow_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Run history of a workflow, newest first: latency, token usage, cache hits.
+    """
+    return await get_runs(db, workflow_id, skip, limit)
+
+
+@router.get("/{workflow_id}/runs/{run_id}", response_model=WorkflowRunDetail)
+async def read_workflow_run(
+    workflow_id: int, run_id: str, db: AsyncSession = Depends(get_db)
+):
+    """
+    One run with its per-node spans (start/end, latency, retrieval and token details).
+    """
+    run = await get_run(db, workflow_id, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.delete("/{workflow_id}")
+async def delete_workflow_api(
+    workflow_id: int,
+    db: AsyncSession = Depends(get_db),
+    resources: RetrievalResources = Depends(get_retrieval_resources),
+):
+    """
+    Delete a workflow, its files and its vector collection.
+    """
+    deleted = await delete_workflow(db, workflow_id, resources)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"workflow_id": workflow_id, "status": "deleted"}
+
+
 @router.get("/", response_model=List[WorkflowResponse])
 async def read_workflows(
     skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
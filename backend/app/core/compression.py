@@ -0,0 +1,193 @@
+# app/core/compression.py
+"""
+Response compression (brotli when the `brotli` package is installed and
+accepted by the client, gzip otherwise).
+
+Unlike a buffer-until-done compressor, streamed responses (SSE run events,
+NDJSON batch results) are flushed after every chunk, so each event still
+reaches the client as soon as it is produced.
+"""
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+
+    def ok(coding):
+        return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and ok("br"):
+        return "br"
+    if ok("gzip"):
+        return "gzip"
+    return None
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        # wbits 31: gzip header + trailer
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def encoded_etag(etag: bytes, encoding: str) -> bytes:
+    """Strong ETag of an encoded representation: "abc" -> "abc-gzip"."""
+    if not etag.endswith(b'"'):
+        return etag
+    return etag[:-1] + f"-{encoding}".encode() + b'"'
+
+
+def strip_encoding_suffix(tag: str) -> str:
+    """Inverse of encoded_etag, for If-None-Match comparison."""
+    for encoding in ("gzip", "br"):
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def _header(headers: list, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses of at least minimum_size bytes
+    (streamed responses always). Responses that already set
+    Content-Encoding are left alone.
+
+    Compressed responses keep a strong ETag specific to their encoding
+    ("abc" -> "abc-gzip" / "abc-br"), since their bytes differ from the
+    identity representation. etag_matches strips the suffix before
+    comparing, and a 304 answering an encoding-specific If-None-Match
+    gets that same tag back.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_headers = scope.get("headers", [])
+        accept = _header(request_headers, b"accept-encoding")
+        encoding = _choose_encoding(accept.decode("latin-1")) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        stream = None  # set once we decided to compress
+        passthrough = False
+
+        def compressor():
+            if encoding == "br":
+                return _BrotliStream(self.brotli_quality)
+            return _GzipStream(self.gzip_level)
+
+        def compressed_start(streaming: bool, length: int = None) -> dict:
+            headers = [
+                (k, v)
+                for k, v in start["headers"]
+                if k.lower() not in (b"content-length", b"etag")
+            ]
+            headers.append((b"content-encoding", encoding.encode()))
+            vary = _header(start["headers"], b"vary")
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary.lower():
+                headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+                headers.append((b"vary", vary + b", Accept-Encoding"))
+            etag = _header(start["headers"], b"etag")
+            if etag is not None:
+                headers.append((b"etag", encoded_etag(etag, encoding)))
+            if not streaming:
+                headers.append((b"content-length", str(length).encode()))
+            return {**start, "headers": headers}
+
+        def not_modified_start(message: dict) -> dict:
+            # Echo the encoded tag the client revalidated with, if that's
+            # what it holds (the 200 it cached was compressed)
+            etag = _header(message["headers"], b"etag")
+            if_none_match = _header(request_headers, b"if-none-match")
+            if etag is None or if_none_match is None:
+                return message
+            tagged = encoded_etag(etag, encoding)
+            if tagged not in (t.strip() for t in if_none_match.split(b",")):
+                return message
+            headers = [(k, v) for k, v in message["headers"] if k.lower() != b"etag"]
+            return {**message, "headers": headers + [(b"etag", tagged)]}
+
+        async def send_wrapper(message):
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    passthrough = True
+                    return await send(not_modified_start(message))
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is None:
+                # First body message: decide
+                if (
+                    _header(start["headers"], b"content-encoding") is not None
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                stream = compressor()
+                if not more_body:
+                    data = stream.finish(body)
+                    await send(compressed_start(False, len(data)))
+                    return await send({**message, "body": data})
+                await send(compressed_start(True))
+
+            data = stream.chunk(body) if more_body else stream.finish(body)
+            await send({**message, "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
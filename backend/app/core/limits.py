@@ -0,0 +1,88 @@
+# app/core/limits.py
+"""
+Request body size limit, enforced while the body is received.
+
+Starlette spools a multipart upload completely (to memory, then a temp
+file) before the endpoint runs, so a size check in the endpoint only
+fires after the whole body is on disk. This middleware refuses a request
+up front when its Content-Length is over the limit, and otherwise counts
+body bytes as the app reads them, aborting at the first chunk past the
+limit (covers chunked uploads and a lying Content-Length).
+"""
+from typing import Optional
+
+from app.core.responses import ORJSONResponse
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+def _content_length(scope) -> Optional[int]:
+    for key, value in scope.get("headers", []):
+        if key.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware answering 413 to request bodies larger than max_bytes.
+
+    When the limit is crossed mid-body the app sees an exception from
+    receive(); FastAPI reports that as a 400 body-parse error, which is
+    dropped here in favour of the 413.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        declared = _content_length(scope)
+        if declared is not None and declared > self.max_bytes:
+            return await self._reject(scope, receive, send)
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = ORJSONResponse(
+            {"detail": f"Request body exceeds the {self.max_bytes} byte limit"},
+            status_code=413,
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,127 @@
+# app/core/logging.py
+"""
+Non-blocking logging setup.
+
+Application code logs through the standard `logging` module. The root
+logger only has a QueueHandler, so a log call costs a queue put on the
+request path; a QueueListener thread formats the records (JSON or text)
+and writes them to stdout.
+
+Records carry correlation fields (run_id, workflow_id, ...) from
+bind_log_context, which stay set across the awaits and node tasks of a
+workflow run.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from config import settings
+
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else came from extra= or the context
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+@contextmanager
+def bind_log_context(**fields):
+    """Attach fields (run_id=..., workflow_id=...) to every record logged inside the block."""
+    previous = _log_context.get()
+    _log_context.set({**previous, **fields})
+    try:
+        yield
+    finally:
+        # set() rather than reset(token): async generators may close in another context
+        _log_context.set(previous)
+
+
+class _ContextFilter(logging.Filter):
+    # Runs in the logging thread, before the record is queued
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render message and traceback now (args may change or not pickle);
+        # formatting is left to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            first, _, rest = line.partition("\n")
+            context = " ".join(f"{k}={v}" for k, v in fields.items())
+            line = f"{first} [{context}]" + (f"\n{rest}" if rest else "")
+        return line
+
+
+def setup_logging():
+    """Route all logging through the queue. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # SQL statements go through the same queue instead of engine echo's
+    # own synchronous stdout handler
+    logging.getLogger("sqlalchemy.engine").setLevel(
+        logging.INFO if settings.DB_ECHO else logging.WARNING
+    )
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on exit
+    atexit.register(_listener.stop)
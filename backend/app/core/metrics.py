@@ -0,0 +1,293 @@
+# app/core/metrics.py
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Each metric is a dict of label values -> numbers behind a lock; recording
+is a dict lookup plus an add (a bisect for histograms), so it is cheap
+enough to stay on for every request. Gauges can also be backed by a
+function evaluated only when /metrics is scraped.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        """Read the (unlabelled) value from function at scrape time."""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    """`with histogram.time(...)`: observe the elapsed seconds of the block."""
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- HTTP ---
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+
+# --- Workflow runs ---
+WORKFLOW_RUN_DURATION = registry.register(Histogram(
+    "workflow_run_duration_seconds",
+    "Workflow run latency",
+    ("workflow_id", "mode", "status"),
+))
+WORKFLOW_NODE_DURATION = registry.register(Histogram(
+    "workflow_node_duration_seconds",
+    "Latency of one node execution by component type",
+    ("component_type", "status"),
+))
+WORKFLOW_RUNS_IN_FLIGHT = registry.register(Gauge(
+    "workflow_runs_in_flight", "Workflow runs currently executing"
+))
+
+# --- Model calls ---
+LLM_REQUEST_DURATION = registry.register(Histogram(
+    "llm_request_duration_seconds", "Chat model call latency", ("model",)
+))
+LLM_REQUEST_ERRORS = registry.register(Counter(
+    "llm_request_errors_total", "Failed chat model calls", ("model",)
+))
+EMBEDDING_REQUEST_DURATION = registry.register(Histogram(
+    "embedding_request_duration_seconds",
+    "Embedding model call latency (cache misses only)",
+    ("model",),
+))
+EMBEDDING_REQUEST_ERRORS = registry.register(Counter(
+    "embedding_request_errors_total", "Failed embedding model calls", ("model",)
+))
+
+# --- Background work / resources (read at scrape time) ---
+INGESTION_QUEUE_DEPTH = registry.register(Gauge(
+    "ingestion_queue_depth", "Files waiting for a background ingestion worker"
+))
+DB_POOL_CHECKED_OUT = registry.register(Gauge(
+    "db_pool_checked_out", "Database connections currently in use"
+))
+DB_POOL_SIZE = registry.register(Gauge(
+    "db_pool_size", "Configured database connection pool size"
+))
+DB_POOL_OVERFLOW = registry.register(Gauge(
+    "db_pool_overflow", "Database connections open beyond the pool size"
+))
+
+
+def bind_db_pool(pool):
+    """Expose pool usage; pools without these counters (e.g. NullPool) are skipped."""
+    for gauge, attr in (
+        (DB_POOL_CHECKED_OUT, "checkedout"),
+        (DB_POOL_SIZE, "size"),
+        (DB_POOL_OVERFLOW, "overflow"),
+    ):
+        gauge.set_function(getattr(pool, attr, None))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request, labelled with the matched
+    route template (/workflows/{workflow_id}), not the raw path, to keep
+    the number of series bounded. Streaming responses are timed to their
+    last byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route.path if route else "unmatched",
+                status=status,
+            )
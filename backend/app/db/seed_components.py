@@ -3,6 +3,7 @@ from sqlalchemy import select
 
 from app.models.component import Component
 from app.workflow.components_registry import COMPONENT_DEFINITIONS
+from app.services.component_catalog import component_catalog
 
 
 async def seed_components(db: AsyncSession):
@@ -27,3 +28,4 @@ async def seed_components(db: AsyncSession):
         )
 
     await db.commit()
+    component_catalog.invalidate()
@@ -2,7 +2,9 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# SQL logging is enabled with settings.DB_ECHO (see app/core/logging.py),
+# not echo=True, which writes every statement synchronously to stdout
+engine = create_async_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
@@ -0,0 +1,34 @@
+# app/llm_models/chat_models.py
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_openai import ChatOpenAI
+from config import settings
+
+
+def get_openai_chat_model():
+    return ChatOpenAI(
+        model="gpt-3.5-turbo",
+        temperature=0.7,
+        api_key=settings.OPENAI_API_KEY)
+
+
+def get_fake_chat_model():
+    # Streams its canned answer character by character; used for local
+    # testing of the streaming endpoints without an API key
+    return FakeListChatModel(
+        responses=[settings.FAKE_LLM_RESPONSE],
+        sleep=settings.FAKE_LLM_TOKEN_DELAY,
+    )
+
+
+# Provider name -> factory. Selected with settings.LLM_PROVIDER
+CHAT_MODEL_PROVIDERS = {
+    "openai": get_openai_chat_model,
+    "fake": get_fake_chat_model,
+}
+
+
+def get_chat_model(provider: str = None):
+    provider = provider or settings.LLM_PROVIDER
+    if provider not in CHAT_MODEL_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    return CHAT_MODEL_PROVIDERS[provider]()
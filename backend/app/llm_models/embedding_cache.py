@@ -0,0 +1,238 @@
+# app/llm_models/embedding_cache.py
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.metrics import EMBEDDING_REQUEST_DURATION, EMBEDDING_REQUEST_ERRORS
+from config import settings
+
+
+def normalize_text(text: str) -> str:
+    # Same text modulo unicode form / whitespace -> same cache entry
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    LRU of embedding vectors (float32) keyed by model name + normalized text,
+    optionally backed by a SQLite file so vectors survive restarts.
+    """
+
+    def __init__(self, max_entries: int, path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    # The LRU is consulted inline; the SQLite tier blocks on disk I/O, so the
+    # async variants run it in a worker thread (under its own lock, so LRU
+    # lookups never wait on a disk read or commit).
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found, missing = self._get_cached(keys)
+        if missing and self._conn is not None:
+            found.update(self._load_persisted(missing))
+        return self._count(keys, found)
+
+    async def aget_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found, missing = self._get_cached(keys)
+        if missing and self._conn is not None:
+            found.update(await asyncio.to_thread(self._load_persisted, missing))
+        return self._count(keys, found)
+
+    def set_many(self, items: Dict[str, List[float]]) -> None:
+        vectors = self._remember(items)
+        if self._conn is not None:
+            self._persist(vectors)
+
+    async def aset_many(self, items: Dict[str, List[float]]) -> None:
+        vectors = self._remember(items)
+        if self._conn is not None:
+            await asyncio.to_thread(self._persist, vectors)
+
+    def _get_cached(self, keys: List[str]):
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+        return found, missing
+
+    def _load_persisted(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        placeholders = ",".join("?" * len(keys))
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                keys,
+            ).fetchall()
+        loaded = {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+        with self._lock:
+            for key, vector in loaded.items():
+                self._put(key, vector)
+        return loaded
+
+    def _count(self, keys: List[str], found: Dict[str, np.ndarray]) -> Dict[str, List[float]]:
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys) - found.keys())
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    def _remember(self, items: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+        vectors = {k: np.asarray(v, dtype=np.float32) for k, v in items.items()}
+        with self._lock:
+            for key, vector in vectors.items():
+                self._put(key, vector)
+        return vectors
+
+    def _persist(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [(k, v.tobytes()) for k, v in vectors.items()],
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "persistent": self._conn is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _put(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model."""
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = cache
+
+    def _lookup(self, texts: List[str]):
+        keys = [self.cache.make_key(self.model_name, t) for t in texts]
+        found = self.cache.get_many(keys)
+        return keys, found, self._missing(keys, texts, found)
+
+    def _missing(self, keys, texts, found):
+        # One request per distinct missing key, even if repeated in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return missing
+
+    def _merge(self, keys, found, missing, vectors):
+        computed = dict(zip(missing.keys(), vectors))
+        if computed:
+            self.cache.set_many(computed)
+        found.update(computed)
+        return [found[key] for key in keys]
+
+    async def _alookup(self, texts: List[str]):
+        keys = [self.cache.make_key(self.model_name, t) for t in texts]
+        found = await self.cache.aget_many(keys)
+        return keys, found, self._missing(keys, texts, found)
+
+    async def _amerge(self, keys, found, missing, vectors):
+        computed = dict(zip(missing.keys(), vectors))
+        if computed:
+            await self.cache.aset_many(computed)
+        found.update(computed)
+        return [found[key] for key in keys]
+
+    def _timed(self):
+        return EMBEDDING_REQUEST_DURATION.time(model=self.model_name)
+
+    def _failed(self):
+        EMBEDDING_REQUEST_ERRORS.inc(model=self.model_name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        vectors = []
+        if missing:
+            try:
+                with self._timed():
+                    vectors = self.underlying.embed_documents(list(missing.values()))
+            except Exception:
+                self._failed()
+                raise
+        return self._merge(keys, found, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text])
+        vectors = []
+        if missing:
+            try:
+                with self._timed():
+                    vectors = [self.underlying.embed_query(text)]
+            except Exception:
+                self._failed()
+                raise
+        return self._merge(keys, found, missing, vectors)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await self._alookup(texts)
+        vectors = []
+        if missing:
+            try:
+                with self._timed():
+                    vectors = await self.underlying.aembed_documents(list(missing.values()))
+            except Exception:
+                self._failed()
+                raise
+        return await self._amerge(keys, found, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await self._alookup([text])
+        vectors = []
+        if missing:
+            try:
+                with self._timed():
+                    vectors = [await self.underlying.aembed_query(text)]
+            except Exception:
+                self._failed()
+                raise
+        return (await self._amerge(keys, found, missing, vectors))[0]
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=settings.EMBEDDING_CACHE_SIZE,
+    path=settings.EMBEDDING_CACHE_PATH,
+)
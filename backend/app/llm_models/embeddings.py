@@ -1,17 +1,76 @@
 # app/services/embedding_service.py
+import functools
+import inspect
+import logging
+
 from langchain_huggingface import HuggingFaceEndpointEmbeddings
 from langchain_openai import OpenAIEmbeddings
+from app.llm_models.embedding_cache import CachedEmbeddings, embedding_cache
+from app.llm_models.local_embeddings import LocalEmbeddings
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+# All providers are wrapped in the shared embedding cache, so repeated
+# chunks (ingestion) and popular questions (retrieval) skip the network call.
+
 def get_huggingface_embedding_function():
-    return HuggingFaceEndpointEmbeddings(
+    model = "sentence-transformers/all-MiniLM-L6-v2"
+    embeddings = HuggingFaceEndpointEmbeddings(
         huggingfacehub_api_token=settings.HUGGINGFACE_API_KEY,
-        model="sentence-transformers/all-MiniLM-L6-v2"
+        model=model
     )
+    return CachedEmbeddings(embeddings, f"huggingface/{model}", embedding_cache)
 
 def get_openai_embedding_function():
-    return OpenAIEmbeddings(
+    model = "text-embedding-3-small"
+    embeddings = OpenAIEmbeddings(
         openai_api_key=settings.OPENAI_API_KEY,
         # Common models: "text-embedding-3-small" (cheaper/newer) or "text-embedding-ada-002"
-        model="text-embedding-3-small" 
-    )
\ No newline at end of file
+        model=model
+    )
+    return CachedEmbeddings(embeddings, f"openai/{model}", embedding_cache)
+
+@functools.lru_cache(maxsize=None)
+def _local_model(model: str) -> LocalEmbeddings:
+    # One loaded model (and thread pool) per process
+    return LocalEmbeddings(model)
+
+def get_local_embedding_function():
+    model = settings.LOCAL_EMBEDDING_MODEL
+    return CachedEmbeddings(_local_model(model), f"local/{model}", embedding_cache)
+
+# Provider name -> factory. Selected with settings.EMBEDDING_PROVIDER or Workflow.embedding_provider
+EMBEDDING_PROVIDERS = {
+    "openai": get_openai_embedding_function,
+    "huggingface": get_huggingface_embedding_function,
+    "local": get_local_embedding_function,
+}
+
+def get_embedding_function(provider: str = None):
+    provider = provider or settings.EMBEDDING_PROVIDER
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider: {provider}")
+    return EMBEDDING_PROVIDERS[provider]()
+
+async def close_embedding_function(embeddings) -> None:
+    """
+    Release what an embedding function holds: the provider's sync and async
+    HTTP clients, or the local model's thread pool.
+    """
+    underlying = getattr(embeddings, "underlying", embeddings)
+    if isinstance(underlying, LocalEmbeddings):
+        underlying.close()
+        _local_model.cache_clear()
+        return
+    # langchain-openai: root_client / root_async_client; huggingface: client / async_client
+    for name in ("root_client", "root_async_client", "client", "async_client"):
+        close = getattr(getattr(underlying, name, None), "close", None)
+        if not callable(close):
+            continue
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.warning("Failed to close embedding client %s", name, exc_info=True)
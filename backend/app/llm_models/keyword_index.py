@@ -0,0 +1,200 @@
+# app/llm_models/keyword_index.py
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# Identifier-like tokens survive whole ("err-404", "x1.2_b") and are also
+# indexed by their parts, so both "ERR-404" and "404" match.
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:[-_./][A-Za-z0-9]+)*")
+PART_RE = re.compile(r"[A-Za-z0-9]+")
+
+# Short queries made of codes / part numbers are answered by keyword lookup alone
+IDENTIFIER_RE = re.compile(r"[A-Z0-9][A-Z0-9_\-./]*[A-Z0-9]")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        parts = PART_RE.findall(match)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def is_keyword_query(query: str) -> bool:
+    terms = query.split()
+    return 0 < len(terms) <= 3 and all(
+        IDENTIFIER_RE.fullmatch(t) and any(ch.isdigit() for ch in t) for t in terms
+    )
+
+
+class KeywordIndex:
+    """
+    In-process BM25 inverted index over the chunks of one collection.
+
+    Lookups touch only the postings of the query terms (no network, no
+    embedding). Persisted as a JSON file of chunks; postings are rebuilt on
+    load.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._docs: Dict[str, dict] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        # Serializes file writes / deletion (snapshots only need _lock)
+        self._save_lock = threading.Lock()
+        self._deleted = False
+
+    # -------- persistence --------
+    @classmethod
+    def load(cls, path: Path) -> "KeywordIndex":
+        index = cls(path)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                docs = json.load(f)
+            for chunk_id, doc in docs.items():
+                index._add(chunk_id, doc["text"], doc["metadata"])
+        return index
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._save_lock:
+            # A save finishing after delete_file must not bring the file back
+            if self._deleted:
+                return
+            with self._lock:
+                snapshot = {
+                    chunk_id: {"text": d["text"], "metadata": d["metadata"]}
+                    for chunk_id, d in self._docs.items()
+                }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp file in the same directory, so os.replace is atomic
+            # and readers never see a half-written file
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.path.parent,
+                prefix=f".{self.path.name}.", suffix=".tmp", delete=False,
+            ) as f:
+                tmp_path = f.name
+                try:
+                    json.dump(snapshot, f)
+                except BaseException:
+                    f.close()
+                    os.unlink(tmp_path)
+                    raise
+            os.replace(tmp_path, self.path)
+
+    def delete_file(self) -> None:
+        if self.path is None:
+            return
+        with self._save_lock:
+            self._deleted = True
+            self.path.unlink(missing_ok=True)
+
+    # -------- writes --------
+    def add(self, ids: Iterable[str], texts: Iterable[str], metadatas: Iterable[dict]):
+        with self._lock:
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                if chunk_id in self._docs:
+                    self._remove(chunk_id)
+                self._add(chunk_id, text, metadata)
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id in self._docs:
+                    self._remove(chunk_id)
+
+    def delete_where(self, **filters):
+        with self._lock:
+            self.delete([cid for cid, d in self._docs.items() if _matches(d["metadata"], filters)])
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._docs
+
+    def _add(self, chunk_id: str, text: str, metadata: dict):
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._docs[chunk_id] = {"text": text, "metadata": metadata, "length": length, "terms": terms}
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+
+    def _remove(self, chunk_id: str):
+        doc = self._docs.pop(chunk_id)
+        self._total_length -= doc["length"]
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    # -------- reads --------
+    def search(
+        self, query: str, k: int, filter: Optional[dict] = None
+    ) -> List[Tuple[Document, float]]:
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    length = self._docs[chunk_id]["length"]
+                    denom = tf + self.K1 * (1 - self.B + self.B * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.K1 + 1) / denom
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for chunk_id, score in ranked:
+                doc = self._docs[chunk_id]
+                if filter and not _matches(doc["metadata"], filter):
+                    continue
+                results.append(
+                    (Document(id=chunk_id, page_content=doc["text"], metadata=doc["metadata"]), score)
+                )
+                if len(results) >= k:
+                    break
+            return results
+
+
+def _matches(metadata: dict, filters: dict) -> bool:
+    return all(metadata.get(key) == value for key, value in filters.items())
+
+
+def reciprocal_rank_fusion(
+    *result_lists: List[Tuple[Document, float]], k: int = 60
+) -> List[Tuple[Document, float]]:
+    """
+    Fuse ranked lists by summing 1 / (k + rank). Documents are identified by
+    id (chunk id), falling back to their content.
+    """
+    fused: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results):
+            key = doc.id or doc.page_content
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank + 1)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return [(docs[key], score) for key, score in ranked]
@@ -0,0 +1,112 @@
+# app/llm_models/local_embeddings.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+
+# Shipped with chromadb as an ONNX model (downloaded once to ~/.cache/chroma)
+ONNX_MINILM = "all-MiniLM-L6-v2"
+
+EncodeFn = Callable[[List[str]], List[List[float]]]
+
+
+def _load_model(model_name: str) -> EncodeFn:
+    """Return a function mapping a batch of texts to float vectors."""
+    if model_name.split("/")[-1] == ONNX_MINILM:
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        model = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+
+        def encode(texts: List[str]) -> List[List[float]]:
+            return [np.asarray(v, dtype=np.float32).tolist() for v in model(texts)]
+
+    else:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                f"Local embedding model '{model_name}' requires sentence-transformers "
+                f"(pip install sentence-transformers); '{ONNX_MINILM}' works without it"
+            ) from e
+
+        model = SentenceTransformer(model_name, device="cpu")
+
+        def encode(texts: List[str]) -> List[List[float]]:
+            return model.encode(
+                texts,
+                batch_size=len(texts),
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            ).tolist()
+
+    # Initialise tokenizer/session once, before worker threads share the model
+    encode(["warmup"])
+    return encode
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embedding model running in-process on CPU: no network round-trip, no
+    rate limits.
+
+    Texts are encoded in fixed-size batches spread over a small thread pool
+    (ONNX runtime / torch release the GIL during inference). The model is
+    loaded on first use; async calls never block the event loop.
+    """
+
+    def __init__(
+        self,
+        model_name: str = settings.LOCAL_EMBEDDING_MODEL,
+        batch_size: int = settings.LOCAL_EMBEDDING_BATCH_SIZE,
+        threads: int = settings.LOCAL_EMBEDDING_THREADS,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="local-embed"
+        )
+        self._encode = None
+        self._load_lock = threading.Lock()
+
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        if self._encode is None:
+            with self._load_lock:
+                if self._encode is None:
+                    self._encode = _load_model(self.model_name)
+        return self._encode(texts)
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        return [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        results = self._executor.map(self._encode_batch, self._batches(texts))
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode_batch([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, self._encode_batch, batch)
+                for batch in self._batches(texts)
+            )
+        )
+        return [vector for batch in results for vector in batch]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(self._executor, self._encode_batch, [text])
+        return vectors[0]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
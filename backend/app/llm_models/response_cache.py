@@ -0,0 +1,424 @@
+# app/llm_models/response_cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+
+def _cosine_distances(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+    norms[norms == 0] = 1e-12
+    return 1.0 - (matrix @ vector) / norms
+
+
+# =========================
+# BACKENDS
+# =========================
+class InMemoryCacheBackend:
+    """LRU dict of key -> (value, expires_at, namespace, vector)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        expires_at: float,
+        namespace: str = None,
+        vector: Optional[List[float]] = None,
+    ) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if vector is not None:
+                vector = np.asarray(vector, dtype=np.float32)
+            self._entries[key] = (value, expires_at, namespace, vector)
+            if namespace is not None and vector is not None:
+                self._namespaces.setdefault(namespace, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def nearest(
+        self, namespace: str, vector: List[float]
+    ) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            now = time.time()
+            keys = [
+                k
+                for k in self._namespaces.get(namespace, ())
+                if self._entries[k][1] >= now
+            ]
+            if not keys:
+                return None
+            matrix = np.stack([self._entries[k][3] for k in keys])
+            distances = _cosine_distances(matrix, np.asarray(vector, dtype=np.float32))
+            best = int(np.argmin(distances))
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][0], float(distances[best])
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def close(self) -> None:
+        pass
+
+    def _remove(self, key: str) -> None:
+        _, _, namespace, _ = self._entries.pop(key)
+        if namespace in self._namespaces:
+            self._namespaces[namespace].discard(key)
+            if not self._namespaces[namespace]:
+                del self._namespaces[namespace]
+
+
+class SQLiteCacheBackend:
+    """
+    Same interface as InMemoryCacheBackend, persisted to a local SQLite file.
+
+    Calls block on disk I/O; ResponseCache's async methods run them in a
+    worker thread. Hits don't write: last_access updates are buffered and
+    flushed with the next set() or every ACCESS_FLUSH_SECONDS. Vectors for
+    the semantic tier are loaded once per namespace and kept in memory.
+    """
+
+    ACCESS_FLUSH_SECONDS = 30.0
+
+    def __init__(self, path: Path, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                namespace TEXT,
+                vector BLOB,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_namespace ON responses(namespace)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        # key -> last access time, not yet written
+        self._pending_access = {}
+        self._last_flush = time.monotonic()
+        # namespace -> {key: (vector, expires_at)}, and its stacked form
+        self._vectors = {}
+        self._matrices = {}
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            # Expired rows are left for set() to purge
+            if row is None or row[1] < now:
+                return None
+            self._touch(key, now)
+            return row[0]
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        expires_at: float,
+        namespace: str = None,
+        vector: Optional[List[float]] = None,
+    ) -> None:
+        vector = np.asarray(vector, dtype=np.float32) if vector is not None else None
+        blob = vector.tobytes() if vector is not None else None
+        now = time.time()
+        with self._lock:
+            self._flush_access()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, namespace, blob, expires_at, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            overflow = count - self.max_entries
+            evicted = []
+            if overflow > 0:
+                evicted = self._conn.execute(
+                    "SELECT key FROM responses ORDER BY last_access LIMIT ?", (overflow,)
+                ).fetchall()
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+                self.evictions += len(evicted)
+            self._conn.commit()
+
+            for (evicted_key,) in evicted:
+                self._forget_vector(evicted_key)
+            self._forget_vector(key)
+            if namespace is not None and vector is not None and namespace in self._vectors:
+                self._vectors[namespace][key] = (vector, expires_at)
+                self._matrices.pop(namespace, None)
+
+    def nearest(
+        self, namespace: str, vector: List[float]
+    ) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            keys, matrix, expires = self._namespace_matrix(namespace)
+            if not keys:
+                return None
+            distances = _cosine_distances(matrix, np.asarray(vector, dtype=np.float32))
+            distances[expires < now] = np.inf
+            best = int(np.argmin(distances))
+            if not np.isfinite(distances[best]):
+                return None
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (keys[best],)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(keys[best], now)
+            return row[0], float(distances[best])
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending_access.clear()
+            self._vectors.clear()
+            self._matrices.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+    # -------- internals (called with _lock held) --------
+    def _touch(self, key: str, now: float) -> None:
+        self._pending_access[key] = now
+        if time.monotonic() - self._last_flush >= self.ACCESS_FLUSH_SECONDS:
+            self._flush_access()
+            self._conn.commit()
+
+    def _flush_access(self) -> None:
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+        self._last_flush = time.monotonic()
+
+    def _namespace_matrix(self, namespace: str):
+        if namespace not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT key, vector, expires_at FROM responses "
+                "WHERE namespace = ? AND vector IS NOT NULL",
+                (namespace,),
+            ).fetchall()
+            self._vectors[namespace] = {
+                key: (np.frombuffer(blob, dtype=np.float32), expires_at)
+                for key, blob, expires_at in rows
+            }
+        if namespace not in self._matrices:
+            entries = self._vectors[namespace]
+            keys = list(entries)
+            matrix = np.stack([entries[k][0] for k in keys]) if keys else None
+            expires = np.array([entries[k][1] for k in keys])
+            self._matrices[namespace] = (keys, matrix, expires)
+        return self._matrices[namespace]
+
+    def _forget_vector(self, key: str) -> None:
+        self._pending_access.pop(key, None)
+        for namespace, entries in self._vectors.items():
+            if entries.pop(key, None) is not None:
+                self._matrices.pop(namespace, None)
+
+
+# =========================
+# CACHE
+# =========================
+class ResponseCache:
+    """
+    Two-tier cache in front of the chat model.
+
+    Exact tier: key = hash(rendered prompt + model params).
+    Semantic tier (optional): reuse an answer whose question embedding is
+    within max_distance (cosine) of the new one, within the same namespace
+    (workflow + retrieved context).
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl_seconds: int,
+        semantic_enabled: bool = False,
+        max_distance: float = 0.05,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.semantic_enabled = semantic_enabled
+        self.max_distance = max_distance
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt_text: str, model_params: dict) -> str:
+        payload = json.dumps(
+            {"prompt": prompt_text, "model": model_params}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_namespace(workflow_id, context: Optional[str]) -> str:
+        context_hash = hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+        return f"{workflow_id}:{context_hash}"
+
+    def lookup(
+        self,
+        key: str,
+        namespace: str = None,
+        embedding: Optional[List[float]] = None,
+    ) -> Optional[str]:
+        return self.lookup_tier(key, namespace, embedding)[0]
+
+    def lookup_tier(
+        self,
+        key: str,
+        namespace: str = None,
+        embedding: Optional[List[float]] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """lookup(), also returning the tier that answered ("exact" | "semantic" | None)."""
+        value = self.backend.get(key)
+        if value is not None:
+            self.exact_hits += 1
+            return value, "exact"
+
+        if self.semantic_enabled and namespace and embedding is not None:
+            match = self.backend.nearest(namespace, embedding)
+            if match and match[1] <= self.max_distance:
+                self.semantic_hits += 1
+                return match[0], "semantic"
+
+        self.misses += 1
+        return None, None
+
+    def store(
+        self,
+        key: str,
+        value: str,
+        namespace: str = None,
+        embedding: Optional[List[float]] = None,
+    ) -> None:
+        if not self.semantic_enabled:
+            namespace, embedding = None, None
+        self.backend.set(
+            key, value, time.time() + self.ttl_seconds, namespace, embedding
+        )
+
+    # Async variants for the event loop: the SQLite backend blocks on disk
+    # I/O, so it runs in a worker thread (the in-memory one stays inline)
+    async def alookup_tier(
+        self,
+        key: str,
+        namespace: str = None,
+        embedding: Optional[List[float]] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if isinstance(self.backend, InMemoryCacheBackend):
+            return self.lookup_tier(key, namespace, embedding)
+        return await asyncio.to_thread(self.lookup_tier, key, namespace, embedding)
+
+    async def astore(
+        self,
+        key: str,
+        value: str,
+        namespace: str = None,
+        embedding: Optional[List[float]] = None,
+    ) -> None:
+        if isinstance(self.backend, InMemoryCacheBackend):
+            return self.store(key, value, namespace, embedding)
+        await asyncio.to_thread(self.store, key, value, namespace, embedding)
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        hits = self.exact_hits + self.semantic_hits
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+        }
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    if settings.RESPONSE_CACHE_BACKEND == "none":
+        return None
+    if settings.RESPONSE_CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(
+            settings.RESPONSE_CACHE_PATH, settings.RESPONSE_CACHE_MAX_ENTRIES
+        )
+    elif settings.RESPONSE_CACHE_BACKEND == "memory":
+        backend = InMemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+    else:
+        raise ValueError(
+            f"Unknown response cache backend: {settings.RESPONSE_CACHE_BACKEND}"
+        )
+    return ResponseCache(
+        backend,
+        ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        semantic_enabled=settings.RESPONSE_CACHE_SEMANTIC,
+        max_distance=settings.RESPONSE_CACHE_MAX_DISTANCE,
+    )
+
+
+response_cache = build_response_cache()
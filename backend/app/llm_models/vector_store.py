@@ -0,0 +1,165 @@
+# app/llm_models/vector_store.py
+import logging
+import threading
+
+import chromadb
+from fastapi import Request
+from langchain_chroma import Chroma
+
+from app.llm_models.embeddings import close_embedding_function, get_embedding_function
+from app.llm_models.keyword_index import KeywordIndex
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Legacy shared collection (before per-workflow collections)
+MAIN_COLLECTION_NAME = "app_knowledge_base"
+
+
+# New collections index by cosine distance (Chroma's default is squared L2)
+COLLECTION_METADATA = {"hnsw:space": "cosine"}
+
+
+def relevance_from_distance(space: str):
+    """
+    Distance -> relevance function for a collection's hnsw:space. Relevance
+    is cosine similarity in every case, so score thresholds mean the same
+    thing for old (l2) and new (cosine) collections; the l2 conversion
+    assumes normalized embeddings (squared L2 = 2 - 2 cos).
+    """
+    if space == "l2":
+        return lambda distance: 1.0 - distance / 2.0
+    # cosine and ip: distance = 1 - cos / 1 - dot
+    return lambda distance: 1.0 - distance
+
+
+def workflow_collection_name(workflow_id: int) -> str:
+    # One collection per workflow: search cost scales with that workflow's
+    # own corpus, and results cannot leak across workflows
+    return f"workflow_{workflow_id}"
+
+
+class RetrievalResources:
+    """
+    Process-wide pool of retrieval clients.
+
+    Created once in the FastAPI lifespan and handed to workflow nodes through
+    the graph run config, so a query reuses the same Chroma client, vector
+    store and embedding client instead of constructing new ones per call.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = str(settings.CHROMA_DB_PATH),
+        keyword_index_directory=settings.KEYWORD_INDEX_PATH,
+    ):
+        self.persist_directory = persist_directory
+        self.keyword_index_directory = keyword_index_directory
+        self._client = None
+        self._embeddings = {}
+        self._vector_stores = {}
+        self._keyword_indexes = {}
+        self._keyword_lock = threading.Lock()
+        self._relevance_fns = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
+
+    def get_embedding_function(self, provider: str = None):
+        provider = provider or settings.EMBEDDING_PROVIDER
+        if provider not in self._embeddings:
+            self._embeddings[provider] = get_embedding_function(provider)
+        return self._embeddings[provider]
+
+    def get_collection(self, collection_name: str = MAIN_COLLECTION_NAME):
+        # Raw chromadb collection, for writes with precomputed embeddings
+        return self.client.get_or_create_collection(
+            collection_name, metadata=COLLECTION_METADATA
+        )
+
+    def get_relevance_fn(self, collection_name: str):
+        # Collections created before COLLECTION_METADATA keep their l2 space
+        if collection_name not in self._relevance_fns:
+            metadata = self.get_collection(collection_name).metadata or {}
+            self._relevance_fns[collection_name] = relevance_from_distance(
+                metadata.get("hnsw:space", "l2")
+            )
+        return self._relevance_fns[collection_name]
+
+    def get_vector_store(
+        self, collection_name: str = MAIN_COLLECTION_NAME, provider: str = None
+    ) -> Chroma:
+        provider = provider or settings.EMBEDDING_PROVIDER
+        key = (collection_name, provider)
+        if key not in self._vector_stores:
+            self._vector_stores[key] = Chroma(
+                client=self.client,
+                collection_name=collection_name,
+                embedding_function=self.get_embedding_function(provider),
+                collection_metadata=COLLECTION_METADATA,
+            )
+        return self._vector_stores[key]
+
+    def _keyword_index_path(self, collection_name: str):
+        return self.keyword_index_directory / f"{collection_name}.json"
+
+    def get_keyword_index(self, collection_name: str) -> KeywordIndex:
+        # Loaded from disk on first use (blocking: call from a thread)
+        with self._keyword_lock:
+            if collection_name not in self._keyword_indexes:
+                self._keyword_indexes[collection_name] = KeywordIndex.load(
+                    self._keyword_index_path(collection_name)
+                )
+            return self._keyword_indexes[collection_name]
+
+    def delete_collection(self, collection_name: str):
+        for key in [k for k in self._vector_stores if k[0] == collection_name]:
+            del self._vector_stores[key]
+        self._relevance_fns.pop(collection_name, None)
+        with self._keyword_lock:
+            index = self._keyword_indexes.pop(collection_name, None)
+        if index is not None:
+            # Also stops a save still running on the loaded index
+            index.delete_file()
+        else:
+            self._keyword_index_path(collection_name).unlink(missing_ok=True)
+        try:
+            self.client.delete_collection(collection_name)
+        except Exception:
+            # Never created (workflow had no documents)
+            pass
+
+    async def close(self):
+        """Close the embedding clients and the Chroma client (app shutdown)."""
+        self._vector_stores.clear()
+        self._keyword_indexes.clear()
+        self._relevance_fns.clear()
+        embeddings, self._embeddings = list(self._embeddings.values()), {}
+        for embedding_function in embeddings:
+            await close_embedding_function(embedding_function)
+
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                _close_chroma_client(client)
+            except Exception:
+                logger.warning("Failed to close the Chroma client", exc_info=True)
+
+
+def _close_chroma_client(client) -> None:
+    close = getattr(client, "close", None)
+    if callable(close):
+        close()
+        return
+    # Clients without close(): stop the shared System (sqlite, segment
+    # readers) and drop it from chromadb's per-path cache
+    client._system.stop()
+    client.clear_system_cache()
+
+
+# Dependency for API routes
+def get_retrieval_resources(request: Request) -> RetrievalResources:
+    return request.app.state.retrieval
@@ -9,4 +9,5 @@ from app.models.workflow import Workflow
 from app.models.component import Component
 from app.models.workflow_node_config import WorkflowNodeConfig
 from app.models.file import File
+from app.models.workflow_run import WorkflowRun
 # from app.models.document import Document
\ No newline at end of file
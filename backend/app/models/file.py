@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, UniqueConstraint, func
 from app.db.session import Base
 
 
 class File(Base):
     __tablename__ = "files"
+    # Content dedup per workflow, enforced against concurrent uploads
+    __table_args__ = (
+        UniqueConstraint("workflow_id", "content_hash", name="uq_files_workflow_content"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -25,6 +29,19 @@ class File(Base):
     # Timestamp when file was uploaded
     uploaded_at = Column(DateTime, server_default=func.now())
 
+    # SHA-256 of the file content, and of the content last ingested
+    content_hash = Column(String(64), nullable=True, index=True)
+    ingested_hash = Column(String(64), nullable=True)
+
     # NEW: Track if document is ingested in vector DB
     is_ingested = Column(Boolean, default=False)
     ingested_at = Column(DateTime, nullable=True)
+
+    # Background ingestion job: pending | queued | running | done | failed
+    ingest_status = Column(String(20), nullable=False, default="pending", server_default="pending")
+    ingest_progress = Column(Float, nullable=False, default=0.0, server_default="0")  # 0.0 - 1.0
+    ingest_error = Column(String(1024), nullable=True)
+    ingest_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Worker process that claimed the running job, and its last sign of life
+    claimed_by = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
@@ -9,5 +9,10 @@ class Workflow(Base):
     description = Column(String, nullable=True)
     # Stores the React Flow nodes and edges structure
     flow_json = Column(JSON, nullable=False) 
+    # Bumped on every graph save; clients send it back for optimistic concurrency
+    graph_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Embedding provider for this workflow's documents and queries
+    # (None = settings.EMBEDDING_PROVIDER)
+    embedding_provider = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
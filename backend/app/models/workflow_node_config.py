@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, UniqueConstraint
 from app.db.session import Base
 
 
 class WorkflowNodeConfig(Base):
     __tablename__ = "workflow_node_configs"
+    # One row per node; also the conflict target of delta-save upserts
+    __table_args__ = (
+        UniqueConstraint("workflow_id", "node_id", name="uq_workflow_node_configs_node"),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, ForeignKey
+from app.db.session import Base
+
+
+class WorkflowRun(Base):
+    """One executed workflow run, with per-node timing (spans)."""
+
+    __tablename__ = "workflow_runs"
+
+    # Run id (uuid hex) generated by the tracer
+    id = Column(String(32), primary_key=True)
+
+    workflow_id = Column(
+        Integer,
+        ForeignKey("workflows.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # run | stream | batch
+    mode = Column(String(20), nullable=False)
+
+    # success | error | cancelled
+    status = Column(String(20), nullable=False)
+    error = Column(String(1024), nullable=True)
+
+    input_query = Column(Text, nullable=True)
+
+    started_at = Column(DateTime, nullable=False, index=True)
+    latency_ms = Column(Float, nullable=True)
+
+    # Totals over all spans
+    llm_prompt_tokens = Column(Integer, nullable=False, default=0)
+    llm_completion_tokens = Column(Integer, nullable=False, default=0)
+    embedding_tokens = Column(Integer, nullable=False, default=0)
+    cache_hits = Column(Integer, nullable=False, default=0)
+    chunks_retrieved = Column(Integer, nullable=False, default=0)
+
+    # One entry per node execution: timestamps, latency, details
+    spans = Column(JSON, nullable=False, default=list)
@@ -6,12 +6,18 @@ from datetime import datetime
 class WorkflowBase(BaseModel):
     name: str
     description: Optional[str] = None
+    # "openai" | "huggingface" | "local"; None = server default
+    embedding_provider: Optional[str] = None
     
 
 # Properties to receive on item creation
 class WorkflowCreate(WorkflowBase):
     pass
 
+# Switching provider re-embeds the workflow's documents
+class WorkflowEmbeddingProviderUpdate(BaseModel):
+    embedding_provider: str
+
 # Properties to return to client
 class WorkflowResponse(WorkflowBase):
     id: int
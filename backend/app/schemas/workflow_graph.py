@@ -1,5 +1,5 @@
 # app/schemas/workflow_graph.py
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Any, Dict, List, Optional
 
 
@@ -40,14 +40,78 @@ class WorkflowMeta(BaseModel):
     description: str
 
 
+# --- Graph read (response shape; the endpoint renders the service dict directly) ---
+class ComponentSummary(BaseModel):
+    type: str
+    name: str
+    description: Optional[str] = None
+    ui_schema: Optional[Dict[str, Any]] = None
+
+
+class GraphNode(BaseModel):
+    # Keys of older flow_json nodes are passed through unchanged
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    type: Optional[str] = None
+    position: Dict[str, float]
+    handles: List[HandleInput] = []
+    config: Dict[str, Any] = {}
+    component: Optional[ComponentSummary] = None  # full format only
+
+
+class GraphEdge(BaseModel):
+    source: str
+    target: str
+    sourceHandle: Optional[str] = None
+    targetHandle: Optional[str] = None
+
+
+class GraphOutput(BaseModel):
+    nodes: List[GraphNode]
+    edges: List[GraphEdge]
+
+
+class WorkflowGraphMeta(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    graph_version: int
+
+
 class WorkflowGraphResponse(BaseModel):
-    graph: Dict[str, Any]
+    workflow: WorkflowGraphMeta
+    graph: GraphOutput
+    # format=compact only: component definitions by type, which the nodes
+    # reference by their "type" instead of embedding a "component" each
+    components: Optional[Dict[str, ComponentSummary]] = None
 
 
 class WorkflowGraphSaveRequest(BaseModel):
     graph: GraphInput
+    # If set, the save is rejected (409) unless the stored graph is still at this version
+    graph_version: Optional[int] = None
 
 
 class WorkflowGraphSaveResponse(BaseModel):
     workflow_id: int
     status: str
+
+
+class WorkflowGraphDeltaRequest(BaseModel):
+    """
+    Incremental graph edit against base_version (the graph_version the
+    client last loaded or saved).
+    """
+
+    base_version: int
+    upsert_nodes: List[NodeInput] = []  # added or changed nodes (full node)
+    remove_nodes: List[str] = []  # node ids; their edges are removed too
+    add_edges: List[EdgeInput] = []
+    remove_edges: List[EdgeInput] = []  # matched on source/target/handles
+
+
+class WorkflowGraphDeltaResponse(BaseModel):
+    workflow_id: int
+    graph_version: int
+    status: str
@@ -0,0 +1,43 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+
+
+class WorkflowRunSummary(BaseModel):
+    id: str
+    workflow_id: int
+    mode: str
+    status: str
+    error: Optional[str] = None
+    input_query: Optional[str] = None
+    started_at: datetime
+    latency_ms: Optional[float] = None
+    llm_prompt_tokens: int = 0
+    llm_completion_tokens: int = 0
+    embedding_tokens: int = 0
+    cache_hits: int = 0
+    chunks_retrieved: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RunSpan(BaseModel):
+    # One node execution (see app.workflow.tracing.Span.to_dict)
+    node_id: str
+    component_type: str
+    offset_ms: float
+    started_at: str
+    ended_at: Optional[str] = None
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+    details: Dict[str, Any] = {}
+
+
+class WorkflowRunDetail(WorkflowRunSummary):
+    spans: List[RunSpan] = []
+
+
+class WorkflowRunResult(BaseModel):
+    # POST /workflows/run; run_id -> GET /workflows/{id}/runs/{run_id}
+    response: Optional[str] = None
+    run_id: str
@@ -0,0 +1,90 @@
+# app/services/component_catalog.py
+import asyncio
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.component import Component
+from app.schemas.component import ComponentResponse
+
+
+class ComponentCatalog:
+    """
+    In-process copy of the components table.
+
+    Component definitions only change when seed_components runs or a
+    component is created, so reads are served from memory: loaded in the
+    app lifespan, dropped by invalidate() after a write and reloaded on the
+    next read. The etag is a content hash of every definition, used for
+    conditional GETs of the catalog (and of graphs that embed it).
+
+    invalidate() bumps a generation counter; a load that was already
+    reading when it ran may hold pre-write rows, so its result is
+    discarded and the read is retried.
+
+    Invalidation is per process; with several workers, a component created
+    through one worker shows up in the others after their restart.
+    """
+
+    def __init__(self):
+        self._by_type: Dict[str, dict] = {}
+        self._active: List[dict] = []
+        self._etag: Optional[str] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._etag is not None
+
+    async def load(self, db: AsyncSession) -> bool:
+        """Read the table; False if invalidated meanwhile (nothing published)."""
+        generation = self._generation
+        result = await db.execute(select(Component).order_by(Component.id))
+        entries = [
+            ComponentResponse.model_validate(c).model_dump(mode="json")
+            for c in result.scalars().all()
+        ]
+        digest = hashlib.sha256(
+            json.dumps(entries, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        if generation != self._generation:
+            return False
+
+        self._by_type = {e["type"]: e for e in entries}
+        self._active = [e for e in entries if e["is_active"]]
+        self._etag = f'"{digest[:32]}"'
+        return True
+
+    async def ensure_loaded(self, db: AsyncSession) -> "ComponentCatalog":
+        if not self.loaded:
+            async with self._lock:
+                # Another request may have reloaded while we waited
+                while not self.loaded:
+                    await self.load(db)
+        return self
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._etag = None
+
+    # Readers below expect ensure_loaded() to have run; returned dicts are
+    # shared, treat them as read-only.
+    @property
+    def etag(self) -> Optional[str]:
+        return self._etag
+
+    def list_active(self) -> List[dict]:
+        return self._active
+
+    def get(self, component_type: str) -> Optional[dict]:
+        return self._by_type.get(component_type)
+
+    def types(self) -> set:
+        return set(self._by_type)
+
+
+component_catalog = ComponentCatalog()
@@ -2,13 +2,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.component import Component
 from app.schemas.component import ComponentCreate
+from app.services.component_catalog import component_catalog
 
 
 async def create_component(db: AsyncSession, payload: ComponentCreate) -> Component:
-    component = Component(**payload.dict())
+    component = Component(**payload.model_dump())
     db.add(component)
     await db.commit()
     await db.refresh(component)
+    # Reloaded from the DB on the next catalog read
+    component_catalog.invalidate()
     return component
 
 
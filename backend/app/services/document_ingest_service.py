@@ -1,15 +1,23 @@
+import asyncio
+import hashlib
+import logging
 import os
-from app.llm_models.embeddings import get_huggingface_embedding_function, get_openai_embedding_function
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, Iterator, List, Optional, Set
+
+from app.llm_models.keyword_index import KeywordIndex
+from app.llm_models.vector_store import RetrievalResources, workflow_collection_name
 from langchain_community.document_loaders import PyMuPDFLoader
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
 
 from config import settings
 
-CHROMA_PATH = str(settings.CHROMA_DB_PATH)
-MAIN_COLLECTION_NAME = "app_knowledge_base"
+logger = logging.getLogger(__name__)
 
 # embedding_function = OpenAIEmbeddings(
 #     model=settings.EMBEDDING_MODEL_NAME,
@@ -18,19 +26,258 @@ MAIN_COLLECTION_NAME = "app_knowledge_base"
 #     tiktoken_model_name=settings.EMBEDDING_TIKTOKEN_MODEL_NAME,
 # )
 
+# PDF parsing/splitting is CPU + disk bound; keep it off the event loop.
+# Each running ingestion holds one of these threads while it streams pages.
+_parse_executor = ThreadPoolExecutor(
+    max_workers=settings.INGEST_PARSE_THREADS, thread_name_prefix="ingest-parse"
+)
+
+ProgressCallback = Callable[[float], Awaitable[None]]
+BatchCallback = Callable[[List[Document]], Awaitable[None]]
+# Awaited before each write to the collection; raises to abort the ingestion
+WriteCheck = Callable[[], Awaitable[None]]
+
+
+class IngestionSuperseded(Exception):
+    """The job was re-queued (new provider, new upload) while it was running."""
+
+
+def iter_pdf_chunks(file_path: str, file_id: int, filename: str) -> Iterator[Document]:
+    """
+    Lazily yield chunks page by page: only one page (and its splits) is
+    materialized at a time, however large the PDF is.
+    """
+    # 1. Load PDF (lazily, one page at a time)
+    loader = PyMuPDFLoader(file_path)
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200
+    )
+    for page in loader.lazy_load():
+        # 2. Add metadata to each document
+        page.metadata["file_id"] = file_id
+        page.metadata["filename"] = filename
+        page.metadata["file_path"] = file_path
+
+        # 3. Split documents into chunks (splitter works per page anyway)
+        yield from text_splitter.split_documents([page])
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def with_stable_ids(chunks: Iterable[Document], file_id: int) -> Iterator[Document]:
+    """
+    Give every chunk a deterministic id: file id + content hash + occurrence
+    number (identical chunks within one file stay distinct). Re-ingesting an
+    unchanged chunk therefore maps to the same vector id.
+    """
+    occurrences = {}
+    for chunk in chunks:
+        digest = chunk_hash(chunk.page_content)
+        n = occurrences.get(digest, 0)
+        occurrences[digest] = n + 1
+        chunk.metadata["chunk_hash"] = digest
+        chunk.id = hashlib.sha256(f"{file_id}:{digest}:{n}".encode("utf-8")).hexdigest()
+        yield chunk
+
+
+def _skip_existing(
+    chunks: Iterable[Document],
+    existing_ids: Set[str],
+    seen_ids: Set[str],
+    keyword_index: Optional[KeywordIndex] = None,
+) -> Iterator[Document]:
+    # Records every chunk id of the new version; yields only ones not yet stored
+    for chunk in chunks:
+        seen_ids.add(chunk.id)
+        if chunk.id not in existing_ids:
+            yield chunk
+        elif keyword_index is not None and chunk.id not in keyword_index:
+            # Embedded before keyword indexing existed: index it, no embedding needed
+            keyword_index.add([chunk.id], [chunk.page_content], [chunk.metadata])
 
-embedding_function = get_openai_embedding_function()
 
-# FREE Model used for development
-embedding_function_free = get_huggingface_embedding_function()
+_END_OF_STREAM = object()
 
-async def ingest_pdf_to_vector_db(file_path: str, filename: str):
+
+def _produce_batches(
+    chunks: Iterable[Document],
+    batch_size: int,
+    queue: asyncio.Queue,
+    loop: asyncio.AbstractEventLoop,
+    stop: threading.Event,
+):
+    """
+    Runs in a parse thread. Pushes batches into a bounded asyncio queue and
+    blocks while it is full, so parsing never runs far ahead of embedding.
+    """
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    try:
+        batch = []
+        for chunk in chunks:
+            if stop.is_set():
+                return
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                put(batch)
+                batch = []
+        if batch:
+            put(batch)
+    except Exception as e:
+        put(e)
+    finally:
+        put(_END_OF_STREAM)
+
+
+def _is_retryable(error: Exception) -> bool:
+    # Rate limits (429) and transient upstream errors from the embedding API
+    status = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    if status in (429, 500, 502, 503, 504):
+        return True
+    return type(error).__name__ in (
+        "RateLimitError",
+        "APITimeoutError",
+        "APIConnectionError",
+    )
+
+
+async def embed_with_retry(embedding_function: Embeddings, texts: List[str]):
+    """
+    aembed_documents with exponential backoff (+ jitter) on rate limiting.
+    """
+    max_retries = settings.INGEST_EMBED_MAX_RETRIES
+    for attempt in range(max_retries + 1):
+        try:
+            return await embedding_function.aembed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            delay = settings.INGEST_EMBED_BACKOFF_SECONDS * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+
+async def embed_and_upsert(
+    chunks: Iterable[Document],
+    embedding_function: Embeddings,
+    collection,
+    on_batch: Optional[BatchCallback] = None,
+    batch_size: int = None,
+    concurrency: int = None,
+    keyword_index: Optional[KeywordIndex] = None,
+    before_write: Optional[WriteCheck] = None,
+) -> int:
+    """
+    Streaming embed pipeline: chunks -> batches -> embed -> upsert.
+
+    `chunks` is consumed in a parse thread (it may be a lazy generator) and
+    handed over through a queue holding at most `concurrency` batches, so
+    peak memory is bounded by batch size x concurrency rather than document
+    size, and embedding overlaps with parsing. Each batch is upserted as soon
+    as it is embedded, so a failure keeps the batches already written.
+    Written chunks are also added to `keyword_index` when given.
+    `before_write` is awaited before every upsert and may raise to abort
+    (e.g. the job was superseded while its batch was being embedded).
+
+    Returns the number of chunks written.
+    """
+    batch_size = batch_size or settings.INGEST_EMBED_BATCH_SIZE
+    concurrency = concurrency or settings.INGEST_EMBED_CONCURRENCY
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    stop = threading.Event()
+    written = 0
+
+    producer = loop.run_in_executor(
+        _parse_executor, _produce_batches, chunks, batch_size, queue, loop, stop
+    )
+
+    async def consume():
+        nonlocal written
+        while True:
+            item = await queue.get()
+            if item is _END_OF_STREAM:
+                # Let the other consumers see it too
+                await queue.put(_END_OF_STREAM)
+                return
+            if isinstance(item, Exception):
+                await queue.put(_END_OF_STREAM)
+                raise item
+
+            texts = [doc.page_content for doc in item]
+            vectors = await embed_with_retry(embedding_function, texts)
+            for doc in item:
+                doc.id = doc.id or str(uuid.uuid4())
+            if before_write:
+                await before_write()
+            await loop.run_in_executor(
+                None,
+                lambda: collection.upsert(
+                    ids=[doc.id for doc in item],
+                    embeddings=vectors,
+                    documents=texts,
+                    metadatas=[doc.metadata for doc in item],
+                ),
+            )
+            if keyword_index is not None:
+                keyword_index.add([doc.id for doc in item], texts, [doc.metadata for doc in item])
+            written += len(item)
+            if on_batch:
+                await on_batch(item)
+
+    consumers = [asyncio.create_task(consume()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*consumers)
+        await producer
+    except BaseException:
+        stop.set()
+        for task in consumers:
+            task.cancel()
+        # Unblock the producer thread if it is waiting on a full queue
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+        raise
+    return written
+
+
+async def ingest_pdf_to_vector_db(
+    file_path: str,
+    filename: str,
+    resources: RetrievalResources,
+    file_id: int,
+    workflow_id: int,
+    progress: Optional[ProgressCallback] = None,
+    incremental: bool = True,
+    embedding_provider: Optional[str] = None,
+    before_write: Optional[WriteCheck] = None,
+):
     """
     Loads PDF, chunks it, and stores in Chroma with metadata.
 
+    Chunks get stable content-hash ids. In incremental mode only chunks that
+    are not already stored for this file are embedded, and stored chunks that
+    no longer exist in the file are deleted; otherwise every vector of the
+    file is replaced. Both modes are idempotent.
+
     Args:
         file_path: Full path to the PDF file
         filename: Original filename for metadata
+        resources: Shared retrieval clients (vector store + embeddings)
+        file_id: File record id, stored on every chunk
+        workflow_id: Owning workflow; selects the target collection
+        progress: Optional async callback receiving 0.0 - 1.0
+        incremental: Only embed new/changed chunks (default)
+        embedding_provider: Workflow's embedding provider (None = server default)
+        before_write: Optional async check awaited before every write; raising
+            aborts the ingestion (used to stop superseded jobs)
 
     Returns:
         True if successful
@@ -39,38 +286,81 @@ async def ingest_pdf_to_vector_db(file_path: str, filename: str):
         Exception: If ingestion fails
     """
     try:
-        print(f"--- INGESTING: {filename} into {MAIN_COLLECTION_NAME} ---")
+        collection_name = workflow_collection_name(workflow_id)
+        logger.info(
+            "Ingesting %s into %s",
+            filename,
+            collection_name,
+            extra={"file_id": file_id, "workflow_id": workflow_id},
+        )
 
-        # 1. Load PDF
-        loader = PyMuPDFLoader(file_path)
-        docs = loader.load()
+        loop = asyncio.get_running_loop()
+        collection = resources.get_collection(collection_name)
+        keyword_index = await loop.run_in_executor(
+            None, resources.get_keyword_index, collection_name
+        )
 
-        # 2. Add metadata to each document
-        for doc in docs:
-            doc.metadata["filename"] = filename
-            doc.metadata["file_path"] = file_path
+        existing_ids: Set[str] = set()
+        if incremental:
+            stored = await loop.run_in_executor(
+                None, lambda: collection.get(where={"file_id": file_id}, include=[])
+            )
+            existing_ids = set(stored["ids"])
+        else:
+            await loop.run_in_executor(
+                None, lambda: collection.delete(where={"file_id": file_id})
+            )
+            keyword_index.delete_where(file_id=file_id)
+
+        async def report_pages(batch: List[Document]):
+            # Pages are parsed in order, so the last chunk's page is the high-water mark
+            meta = batch[-1].metadata
+            if progress and meta.get("total_pages"):
+                await progress(min(1.0, (meta.get("page", 0) + 1) / meta["total_pages"]))
 
-        # 3. Split documents into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
+        # 4. Stream pages -> chunks -> embeddings -> Chroma
+        seen_ids: Set[str] = set()
+        chunks = with_stable_ids(iter_pdf_chunks(file_path, file_id, filename), file_id)
+        written = await embed_and_upsert(
+            _skip_existing(chunks, existing_ids, seen_ids, keyword_index),
+            resources.get_embedding_function(embedding_provider),
+            collection,
+            on_batch=report_pages,
+            keyword_index=keyword_index,
+            before_write=before_write,
         )
-        splits = text_splitter.split_documents(docs)
 
-        if not splits:
-            print(f"--- WARNING: No content extracted from {filename} ---")
+        # 5. Drop chunks that disappeared from the new version of the file
+        stale_ids = list(existing_ids - seen_ids)
+        if before_write:
+            await before_write()
+        if stale_ids:
+            await loop.run_in_executor(None, lambda: collection.delete(ids=stale_ids))
+            keyword_index.delete(stale_ids)
+
+        # 6. Persist the keyword index next to the vector DB
+        await loop.run_in_executor(None, keyword_index.save)
+
+        if not seen_ids:
+            logger.warning("No content extracted from %s", filename, extra={"file_id": file_id})
             return False
 
-        # 4. Save to Chroma with embeddings
-        Chroma.from_documents(
-            documents=splits,
-            embedding=embedding_function,
-            persist_directory=CHROMA_PATH,
-            collection_name=MAIN_COLLECTION_NAME,
+        logger.info(
+            "Ingested %s: %d chunks embedded, %d unchanged, %d removed",
+            filename,
+            written,
+            len(seen_ids) - written,
+            len(stale_ids),
+            extra={"file_id": file_id, "workflow_id": workflow_id},
         )
-
-        print(f"--- SUCCESS: Added {len(splits)} chunks from {filename} ---")
         return True
 
-    except Exception as e:
-        print(f"--- INGESTION ERROR for {filename}: {str(e)} ---")
+    except IngestionSuperseded:
         raise
+    except Exception:
+        logger.exception("Ingestion failed for %s", filename, extra={"file_id": file_id})
+        raise
+
+
+def shutdown_parse_executor():
+    _parse_executor.shutdown(wait=False, cancel_futures=True)
@@ -1,62 +1,180 @@
+import asyncio
+import hashlib
+import os
+import tempfile
 from pathlib import Path
 from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.file import File
+from app.llm_models.vector_store import RetrievalResources, workflow_collection_name
 from config import settings
 
 
+class UploadTooLargeError(Exception):
+    pass
+
+
+def _write_chunk(out, hasher, chunk: bytes):
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+async def _stream_to_temp_file(file: UploadFile, directory: Path):
+    """
+    Copy the upload to a temp file in `directory` in fixed-size chunks,
+    hashing as it goes. Writes run in a thread, so the event loop never
+    blocks on disk. Returns (temp path, size, sha256 hex).
+
+    Starlette has already spooled the body by now; the request itself is
+    bounded by RequestSizeLimitMiddleware while it is received. This check
+    enforces the exact per-file limit.
+    """
+    if file.size is not None and file.size > settings.UPLOAD_MAX_BYTES:
+        raise UploadTooLargeError(
+            f"File exceeds the {settings.UPLOAD_MAX_BYTES} byte upload limit"
+        )
+
+    out = await asyncio.to_thread(
+        tempfile.NamedTemporaryFile, dir=directory, prefix=".upload-", delete=False
+    )
+    tmp_path = Path(out.name)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > settings.UPLOAD_MAX_BYTES:
+                raise UploadTooLargeError(
+                    f"File exceeds the {settings.UPLOAD_MAX_BYTES} byte upload limit"
+                )
+            await asyncio.to_thread(_write_chunk, out, hasher, chunk)
+        await asyncio.to_thread(out.close)
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+        raise
+    return tmp_path, size, hasher.hexdigest()
+
+
 async def save_uploaded_file(
     db: AsyncSession, file: UploadFile, workflow_id: int
 ) -> dict:
     """
     Save an uploaded file to the user_files folder and store metadata in database.
     workflow_id is required - files are associated with a workflow from upload.
-    """
-    # Create user_files directory if it doesn't exist
-    # Use the anchor from settings so the location never changes
-    user_files_dir = settings.PROJECT_BASE_DIR / "user_files"
 
-    # Create it safely
+    The upload is streamed to a temp file (bounded by UPLOAD_MAX_BYTES,
+    hashed on the fly) and atomically renamed to a content-addressed name,
+    so concurrent uploads with the same filename never overwrite each other.
+    Concurrent uploads of the same content are settled by the
+    (workflow_id, content_hash) unique constraint: the loser returns the
+    winner's record as deduplicated.
+    """
+    user_files_dir = settings.USER_FILES_DIR
     user_files_dir.mkdir(parents=True, exist_ok=True)
+    filename = Path(file.filename).name
 
-    # Save using that directory
-    file_path = user_files_dir / Path(file.filename).name
-
-    # Save the file to disk
+    tmp_path = None
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Save metadata to database
-        file_record = File(
-            workflow_id=workflow_id,
-            filename=file.filename,
-            filepath=str(file_path),
-            size=len(content),
-            content_type=file.content_type,
+        tmp_path, size, content_hash = await _stream_to_temp_file(file, user_files_dir)
+
+        # Identical content already uploaded to this workflow: reuse it
+        duplicate = await _find_duplicate(db, workflow_id, content_hash)
+        if duplicate:
+            return {**_file_response(duplicate), "deduplicated": True}
+
+        file_path = user_files_dir / f"{workflow_id}_{content_hash[:16]}_{filename}"
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+        tmp_path = None
+
+        # Same filename in this workflow = new version of that document.
+        # Keep the record (and its chunk ids) so re-ingestion is incremental.
+        result = await db.execute(
+            select(File).filter(
+                File.workflow_id == workflow_id, File.filename == file.filename
+            )
         )
+        file_record = result.scalars().first()
+        previous_path = None
+        if file_record:
+            previous_path = file_record.filepath
+            file_record.filepath = str(file_path)
+            file_record.size = size
+            file_record.content_type = file.content_type
+            file_record.content_hash = content_hash
+            file_record.is_ingested = False
+            # Supersedes a job still ingesting the previous version
+            file_record.ingest_status = "pending"
+            file_record.ingest_progress = 0.0
+            file_record.ingest_error = None
+            file_record.claimed_by = None
+        else:
+            # Save metadata to database
+            file_record = File(
+                workflow_id=workflow_id,
+                filename=file.filename,
+                filepath=str(file_path),
+                size=size,
+                content_type=file.content_type,
+                content_hash=content_hash,
+            )
         db.add(file_record)
-        await db.commit()
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same content committed first
+            await db.rollback()
+            duplicate = await _find_duplicate(db, workflow_id, content_hash)
+            if duplicate is None:
+                raise
+            if duplicate.filepath != str(file_path):
+                await asyncio.to_thread(file_path.unlink, missing_ok=True)
+            return {**_file_response(duplicate), "deduplicated": True}
         await db.refresh(file_record)
 
-        return {
-            "id": file_record.id,
-            "filename": file.filename,
-            "filepath": str(file_path),
-            "size": len(content),
-            "content_type": file.content_type,
-            "workflow_id": workflow_id,
-            "status": "success",
-        }
+        # The previous version's bytes are no longer referenced
+        if previous_path and previous_path != str(file_path):
+            await asyncio.to_thread(Path(previous_path).unlink, missing_ok=True)
+
+        return _file_response(file_record)
+    except UploadTooLargeError:
+        raise
     except Exception as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        if tmp_path is not None:
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+
+
+async def _find_duplicate(db: AsyncSession, workflow_id: int, content_hash: str):
+    result = await db.execute(
+        select(File).filter(
+            File.workflow_id == workflow_id, File.content_hash == content_hash
+        )
+    )
+    return result.scalars().first()
+
+
+def _file_response(file_record: File) -> dict:
+    return {
+        "id": file_record.id,
+        "filename": file_record.filename,
+        "filepath": file_record.filepath,
+        "size": file_record.size,
+        "content_type": file_record.content_type,
+        "workflow_id": file_record.workflow_id,
+        "content_hash": file_record.content_hash,
+        "status": "success",
+    }
 
 
-async def delete_file(db: AsyncSession, file_id: int) -> dict:
+async def delete_file(
+    db: AsyncSession, file_id: int, resources: RetrievalResources
+) -> dict:
     """
-    Delete a file from user_files folder and database.
+    Delete a file from user_files folder, its vectors, and database.
     """
     try:
         # Get file record from database
@@ -71,6 +189,16 @@ async def delete_file(db: AsyncSession, file_id: int) -> dict:
         if file_path.exists():
             file_path.unlink()
 
+        # Delete its chunks from the workflow's collection and keyword index
+        collection_name = workflow_collection_name(file_record.workflow_id)
+        collection = resources.get_collection(collection_name)
+        await asyncio.to_thread(collection.delete, where={"file_id": file_record.id})
+        keyword_index = await asyncio.to_thread(
+            resources.get_keyword_index, collection_name
+        )
+        keyword_index.delete_where(file_id=file_record.id)
+        await asyncio.to_thread(keyword_index.save)
+
         # Delete from database
         await db.delete(file_record)
         await db.commit()
@@ -98,11 +226,34 @@ async def get_file_list(db: AsyncSession, workflow_id: int) -> list:
                 "size": f.size,
                 "content_type": f.content_type,
                 "workflow_id": f.workflow_id,
-                "uploaded_at": f.uploaded_at.isoformat() if fuploaded_at else None,
+                "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
                 "is_ingested": f.is_ingested,
                 "ingested_at": f.ingested_at.isoformat() if f.ingested_at else None,
+                "ingest_status": f.ingest_status,
+                "ingest_progress": f.ingest_progress,
+                "ingest_error": f.ingest_error,
             }
             for f in files
         ]
     except Exception as e:
         return []
+
+
+async def get_ingestion_status(db: AsyncSession, workflow_id: int) -> list:
+    """
+    Ingestion job status for every file of a workflow (polled by the UI).
+    """
+    query = select(File).filter(File.workflow_id == workflow_id)
+    result = await db.execute(query)
+    return [
+        {
+            "id": f.id,
+            "filename": f.filename,
+            "status": f.ingest_status,
+            "progress": f.ingest_progress,
+            "error": f.ingest_error,
+            "attempts": f.ingest_attempts,
+            "ingested_at": f.ingested_at.isoformat() if f.ingested_at else None,
+        }
+        for f in result.scalars().all()
+    ]
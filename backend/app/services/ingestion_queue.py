@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.session import SessionLocal
+from app.llm_models.vector_store import RetrievalResources
+from app.models.file import File
+from app.models.workflow import Workflow
+from app.services.document_ingest_service import IngestionSuperseded, ingest_pdf_to_vector_db
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Job states stored on File.ingest_status
+PENDING = "pending"
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class IngestionQueue:
+    """
+    Background document ingestion.
+
+    /workflows/build enqueues file ids; a fixed pool of worker tasks parses,
+    chunks and embeds them. Job state lives on the File row, which is also
+    the lock between worker processes: a job is claimed with a conditional
+    UPDATE (queued -> running), so each one runs in exactly one process even
+    though every process queues it locally. Running jobs keep a heartbeat;
+    recover() (at startup and then periodically) re-queues the ones whose
+    worker stopped beating, and picks up queued jobs.
+    """
+
+    def __init__(self, resources: RetrievalResources, workers: int = settings.INGEST_WORKERS):
+        self.resources = resources
+        self.num_workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._active = set()  # file ids queued or running in this process
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.num_workers)
+        ]
+        await self.recover()
+        self._workers.append(asyncio.create_task(self._recover_periodically()))
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Hand interrupted jobs back right away instead of waiting to go stale
+        async with SessionLocal() as db:
+            await db.execute(
+                update(File)
+                .where(File.claimed_by == self.worker_id, File.ingest_status == RUNNING)
+                .values(ingest_status=QUEUED, claimed_by=None)
+            )
+            await db.commit()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def recover(self):
+        """Re-queue running jobs with a stale heartbeat, and queue every queued job."""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.INGEST_STALE_SECONDS)
+        async with SessionLocal() as db:
+            result = await db.execute(
+                update(File)
+                .where(
+                    File.ingest_status == RUNNING,
+                    or_(File.heartbeat_at.is_(None), File.heartbeat_at < cutoff),
+                )
+                .values(ingest_status=QUEUED, claimed_by=None)
+                .returning(File.id)
+                .execution_options(synchronize_session=False)
+            )
+            stale_ids = result.scalars().all()
+            await db.commit()
+
+            result = await db.execute(select(File.id).where(File.ingest_status == QUEUED))
+            file_ids = result.scalars().all()
+
+        for file_id in file_ids:
+            self._put(file_id)
+        if stale_ids:
+            logger.info("Re-queued %d stale ingestion job(s)", len(stale_ids))
+
+    async def _recover_periodically(self):
+        while True:
+            await asyncio.sleep(settings.INGEST_STALE_SECONDS)
+            try:
+                await self.recover()
+            except Exception:
+                logger.exception("Ingestion recovery failed")
+
+    async def enqueue(self, db: AsyncSession, files: List[File]) -> List[int]:
+        """Queue every file that still needs ingesting. Returns the queued ids."""
+        queued = []
+        for file in files:
+            # Running elsewhere; a reset (provider switch, new upload) sets
+            # the file back to pending first, which supersedes that job
+            if file.is_ingested or file.ingest_status in (DONE, RUNNING):
+                continue
+            file.ingest_status = QUEUED
+            file.ingest_progress = 0.0
+            file.ingest_error = None
+            db.add(file)
+            queued.append(file.id)
+
+        await db.commit()
+        for file_id in queued:
+            self._put(file_id)
+        return queued
+
+    def _put(self, file_id: int):
+        # Already queued/running here: a superseded job re-puts its file when it ends
+        if file_id not in self._active:
+            self._active.add(file_id)
+            self._queue.put_nowait(file_id)
+
+    async def _worker(self):
+        while True:
+            file_id = await self._queue.get()
+            superseded = False
+            try:
+                superseded = await self._process(file_id)
+            except Exception:
+                logger.exception("Ingestion worker error", extra={"file_id": file_id})
+            finally:
+                self._active.discard(file_id)
+                self._queue.task_done()
+            if superseded:
+                # Re-queued while running; the claim decides who runs it now
+                self._put(file_id)
+
+    async def _claim(self, db: AsyncSession, file_id: int) -> Optional[int]:
+        """
+        queued -> running for this worker. Returns the claim's attempt number
+        (its token), or None if another worker got there first.
+        """
+        result = await db.execute(
+            update(File)
+            .where(File.id == file_id, File.ingest_status == QUEUED)
+            .values(
+                ingest_status=RUNNING,
+                claimed_by=self.worker_id,
+                heartbeat_at=datetime.utcnow(),
+                ingest_attempts=File.ingest_attempts + 1,
+            )
+            .returning(File.ingest_attempts)
+            .execution_options(synchronize_session=False)
+        )
+        attempt = result.scalar_one_or_none()
+        await db.commit()
+        return attempt
+
+    def _holds_claim(self, file_id: int, attempt: int):
+        return (
+            File.id == file_id,
+            File.ingest_status == RUNNING,
+            File.claimed_by == self.worker_id,
+            File.ingest_attempts == attempt,
+        )
+
+    async def _update_claimed(
+        self, db: AsyncSession, file_id: int, attempt: int, **values
+    ) -> bool:
+        """Write job fields only while this claim is still the current one."""
+        result = await db.execute(
+            update(File)
+            .where(*self._holds_claim(file_id, attempt))
+            .values(**values)
+            .returning(File.id)
+            .execution_options(synchronize_session=False)
+        )
+        owned = result.scalar_one_or_none() is not None
+        await db.commit()
+        return owned
+
+    async def _heartbeat(self, file_id: int, attempt: int):
+        # Own session: the job's session is busy with progress updates
+        async with SessionLocal() as db:
+            while True:
+                await asyncio.sleep(settings.INGEST_HEARTBEAT_SECONDS)
+                if not await self._update_claimed(
+                    db, file_id, attempt, heartbeat_at=datetime.utcnow()
+                ):
+                    return
+
+    async def _check_claim(self, file_id: int, attempt: int):
+        """Raise IngestionSuperseded once the file was reset or re-claimed."""
+        async with SessionLocal() as db:
+            current = await db.scalar(
+                select(File.id).where(*self._holds_claim(file_id, attempt))
+            )
+        if current is None:
+            raise IngestionSuperseded(f"File {file_id} was re-queued")
+
+    async def _process(self, file_id: int) -> bool:
+        """Run one job. Returns True if it was superseded while running."""
+        async with SessionLocal() as db:
+            attempt = await self._claim(db, file_id)
+            if attempt is None:
+                return False
+            result = await db.execute(select(File).where(File.id == file_id))
+            file = result.scalar_one()
+
+            if file.content_hash and file.content_hash == file.ingested_hash:
+                # Same bytes as the last successful ingestion: nothing to embed
+                await self._update_claimed(
+                    db,
+                    file_id,
+                    attempt,
+                    ingest_status=DONE,
+                    ingest_progress=1.0,
+                    is_ingested=True,
+                    claimed_by=None,
+                )
+                return False
+
+            embedding_provider = await db.scalar(
+                select(Workflow.embedding_provider).where(Workflow.id == file.workflow_id)
+            )
+
+            async def report_progress(fraction: float):
+                await self._update_claimed(
+                    db, file_id, attempt, ingest_progress=fraction, heartbeat_at=datetime.utcnow()
+                )
+
+            heartbeat = asyncio.create_task(self._heartbeat(file_id, attempt))
+            try:
+                await ingest_pdf_to_vector_db(
+                    file.filepath,
+                    file.filename,
+                    self.resources,
+                    file.id,
+                    file.workflow_id,
+                    progress=report_progress,
+                    embedding_provider=embedding_provider,
+                    # Vectors of a superseded job (e.g. old provider) must not land
+                    before_write=lambda: self._check_claim(file_id, attempt),
+                )
+                outcome = dict(
+                    ingest_status=DONE,
+                    ingest_progress=1.0,
+                    is_ingested=True,
+                    ingested_at=datetime.utcnow(),
+                    ingested_hash=file.content_hash,
+                )
+            except IngestionSuperseded:
+                logger.info("Ingestion superseded", extra={"file_id": file_id})
+                return True
+            except Exception as e:
+                outcome = dict(ingest_status=FAILED, ingest_error=str(e)[:1024])
+            finally:
+                heartbeat.cancel()
+
+            if not await self._update_claimed(db, file_id, attempt, claimed_by=None, **outcome):
+                logger.info(
+                    "Ingestion superseded before completion", extra={"file_id": file_id}
+                )
+                return True
+            return False
+
+
+# Dependency for API routes
+def get_ingestion_queue(request: Request) -> IngestionQueue:
+    return request.app.state.ingestion_queue
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.metrics import WORKFLOW_RUN_DURATION, WORKFLOW_RUNS_IN_FLIGHT
+from app.db.session import SessionLocal
+from app.models.workflow_run import WorkflowRun
+from app.workflow.tracing import RunTracer
+from app.core.logging import bind_log_context
+
+logger = logging.getLogger(__name__)
+
+
+async def save_run(tracer: RunTracer):
+    """Persist a finished run. Uses its own session: streamed runs outlive the request's."""
+    record = WorkflowRun(
+        id=tracer.run_id,
+        workflow_id=tracer.workflow_id,
+        mode=tracer.mode,
+        status=tracer.status,
+        error=tracer.error,
+        input_query=tracer.input_query,
+        started_at=tracer.started_at,
+        latency_ms=tracer.latency_ms,
+        spans=[span.to_dict() for span in tracer.spans],
+        **tracer.totals(),
+    )
+    try:
+        async with SessionLocal() as db:
+            db.add(record)
+            await db.commit()
+    except Exception:
+        # Losing a trace must never fail the run itself
+        logger.exception("Could not save run %s", tracer.run_id)
+
+
+@asynccontextmanager
+async def traced_run(workflow_id: int, input_query: str, mode: str):
+    """
+    Yield a RunTracer for one run; the run is saved however it ends. Logs
+    emitted during the run carry its run_id and workflow_id.
+    """
+    tracer = RunTracer(workflow_id, input_query, mode)
+    WORKFLOW_RUNS_IN_FLIGHT.inc()
+    try:
+        with bind_log_context(run_id=tracer.run_id, workflow_id=workflow_id):
+            yield tracer
+    except BaseException as e:
+        tracer.finish(e)
+        raise
+    else:
+        tracer.finish()
+    finally:
+        WORKFLOW_RUNS_IN_FLIGHT.dec()
+        WORKFLOW_RUN_DURATION.observe(
+            tracer.latency_ms / 1000,
+            workflow_id=workflow_id,
+            mode=mode,
+            status=tracer.status,
+        )
+        # Shielded so a cancelled (disconnected) run is still recorded
+        await asyncio.shield(save_run(tracer))
+
+
+async def get_runs(db: AsyncSession, workflow_id: int, skip: int = 0, limit: int = 50):
+    result = await db.execute(
+        select(WorkflowRun)
+        .where(WorkflowRun.workflow_id == workflow_id)
+        .order_by(WorkflowRun.started_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_run(db: AsyncSession, workflow_id: int, run_id: str):
+    result = await db.execute(
+        select(WorkflowRun).where(
+            WorkflowRun.id == run_id, WorkflowRun.workflow_id == workflow_id
+        )
+    )
+    return result.scalars().first()
@@ -1,17 +1,52 @@
 # app/services/workflow_graph_service.py
 
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.models.workflow import Workflow
 from app.models.workflow_node_config import WorkflowNodeConfig
-from app.models.component import Component
+from app.services.component_catalog import component_catalog
+from app.workflow.graph_cache import graph_cache
 
 
 # =========================
 # GET WORKFLOW GRAPH
 # =========================
-async def get_workflow_graph(db: AsyncSession, workflow_id: int):
+def _component_summary(component: dict) -> dict:
+    return {
+        "type": component["type"],
+        "name": component["name"],
+        "description": component["description"],
+        "ui_schema": component["ui_schema"],
+    }
+
+
+async def get_workflow_graph_version(db: AsyncSession, workflow_id: int):
+    """graph_version alone (no flow_json / configs), or None if the workflow doesn't exist."""
+    result = await db.execute(
+        select(Workflow.graph_version).where(Workflow.id == workflow_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def graph_etag(db: AsyncSession, graph_version: int, compact: bool = False) -> str:
+    """
+    ETag of a get_workflow_graph response. Every save bumps graph_version,
+    and the catalog etag covers the embedded component definitions, so the
+    pair identifies the payload without building it.
+    """
+    catalog = await component_catalog.ensure_loaded(db)
+    fmt = "c" if compact else "f"
+    return f'"{graph_version}-{catalog.etag.strip(chr(34))[:16]}-{fmt}"'
+
+
+async def get_workflow_graph(db: AsyncSession, workflow_id: int, compact: bool = False):
+    """
+    Graph enriched with node configs and component metadata. compact=True
+    lists each component definition once under "components" instead of
+    embedding it in every node.
+    """
     # 1. Fetch Workflow
     result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
     workflow = result.scalar_one_or_none()
@@ -30,42 +65,28 @@ async def get_workflow_graph(db: AsyncSession, workflow_id: int):
 
     node_config_map = {cfg.node_id: cfg for cfg in node_configs}
 
-    # 3. Fetch Components
-    component_types = {cfg.component_type for cfg in node_configs}
-
-    components = []
-    if component_types:
-        result = await db.execute(
-            select(Component).where(Component.type.in_(component_types))
-        )
-        components = result.scalars().all()
-
-    component_map = {c.type: c for c in components}
+    # 3. Component metadata (in-memory catalog, no query)
+    catalog = await component_catalog.ensure_loaded(db)
 
     # 4. Merge node + config + component metadata
     enriched_nodes = []
+    components = {}
     for node in nodes:
         node_id = node["id"]
         cfg = node_config_map.get(node_id)
-        component = component_map.get(cfg.component_type) if cfg else None
-
-        enriched_nodes.append(
-            {
-                **node,
-                "handles": cfg.handles if cfg else [],  # NEW: Restore handles
-                "component": (
-                    {
-                        "type": component.type,
-                        "name": component.name,
-                        "description": component.description,
-                        "ui_schema": component.ui_schema,
-                    }
-                    if component
-                    else None
-                ),
-                "config": cfg.config_values if cfg else {},
-            }
-        )
+        component = catalog.get(cfg.component_type) if cfg else None
+
+        enriched = {
+            **node,
+            "handles": cfg.handles if cfg else [],  # NEW: Restore handles
+            "config": cfg.config_values if cfg else {},
+        }
+        if compact:
+            if component and component["type"] not in components:
+                components[component["type"]] = _component_summary(component)
+        else:
+            enriched["component"] = _component_summary(component) if component else None
+        enriched_nodes.append(enriched)
 
     # NEW: Edges include handle references
     enriched_edges = [
@@ -78,20 +99,135 @@ async def get_workflow_graph(db: AsyncSession, workflow_id: int):
         for e in edges
     ]
 
-    return {
+    response = {
         "workflow": {
             "id": workflow.id,
             "name": workflow.name,
             "description": workflow.description,
+            "graph_version": workflow.graph_version,
         },
         "graph": {"nodes": enriched_nodes, "edges": enriched_edges},  # NEW: Updated
     }
+    if compact:
+        response["components"] = components
+    return response
 
 
 # =========================
 # SAVE WORKFLOW GRAPH
 # =========================
+class GraphVersionConflictError(Exception):
+    """The graph was saved by someone else since the client loaded it."""
+
+    def __init__(self, workflow_id: int, expected: int, current: int):
+        self.current_version = current
+        super().__init__(
+            f"Workflow {workflow_id} graph is at version {current}, not {expected}; "
+            f"reload the graph and retry"
+        )
+
+
+def _node_handles(node) -> list:
+    return [
+        {
+            "id": h.id,
+            "type": h.type,
+            "position": h.position,
+        }
+        for h in (node.handles or [])
+    ]
+
+
+def _flow_node(node) -> dict:
+    # flow_json keeps layout only; config values live in WorkflowNodeConfig
+    return {
+        "id": node.id,
+        "type": node.type,
+        "position": node.position,
+        "handles": _node_handles(node),
+    }
+
+
+def _flow_edge(edge) -> dict:
+    return {
+        "source": edge.source,
+        "target": edge.target,
+        "sourceHandle": edge.sourceHandle,
+        "targetHandle": edge.targetHandle,
+    }
+
+
+def _node_config_row(workflow_id: int, node) -> dict:
+    return {
+        "workflow_id": workflow_id,
+        "node_id": node.id,
+        "component_type": node.type,
+        "config_values": node.data.get("config", {}),
+        "handles": _node_handles(node),
+    }
+
+
+async def _validate_component_types(db: AsyncSession, component_types: set):
+    if not component_types:
+        return
+    catalog = await component_catalog.ensure_loaded(db)
+    invalid = component_types - catalog.types()
+    if invalid:
+        raise ValueError(f"Invalid component types: {invalid}")
+
+
+async def _bump_graph_version(
+    db: AsyncSession, workflow: Workflow, flow_json: dict, expected_version
+) -> int:
+    """
+    Write flow_json and increment graph_version in one conditional UPDATE.
+    If expected_version is given and another save got there first, nothing
+    is written and GraphVersionConflictError is raised.
+    """
+    stmt = update(Workflow).where(Workflow.id == workflow.id)
+    if expected_version is not None:
+        stmt = stmt.where(Workflow.graph_version == expected_version)
+    result = await db.execute(
+        stmt.values(flow_json=flow_json, graph_version=Workflow.graph_version + 1)
+        .returning(Workflow.graph_version)
+        .execution_options(synchronize_session=False)
+    )
+    new_version = result.scalar_one_or_none()
+    if new_version is None:
+        # workflow.graph_version is what this session loaded; report the
+        # version the winning save left behind instead
+        current = await db.execute(
+            select(Workflow.graph_version).where(Workflow.id == workflow.id)
+        )
+        raise GraphVersionConflictError(
+            workflow.id, expected_version, current.scalar_one_or_none()
+        )
+    return new_version
+
+
+def _upsert_node_configs(db: AsyncSession, rows: list):
+    """INSERT ... ON CONFLICT (workflow_id, node_id) DO UPDATE for many rows at once."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Node config upsert not supported on {dialect}")
+
+    stmt = insert(WorkflowNodeConfig).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["workflow_id", "node_id"],
+        set_={
+            "component_type": stmt.excluded.component_type,
+            "config_values": stmt.excluded.config_values,
+            "handles": stmt.excluded.handles,
+        },
+    )
+
+
 async def save_workflow_graph(db: AsyncSession, workflow_id: int, payload):
+    """Replace the whole graph. Returns the new graph_version."""
     async with db.begin():  # 🔒 atomic transaction
         # 1️⃣ Check if workflow exists
         result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
@@ -100,53 +236,18 @@ async def save_workflow_graph(db: AsyncSession, workflow_id: int, payload):
             raise ValueError(f"Workflow with id {workflow_id} not found")
 
         # 2️⃣ Validate component types
-        component_types = {node.type for node in payload.graph.nodes}
-
-        result = await db.execute(
-            select(Component.type).where(Component.type.in_(component_types))
-        )
-        valid_types = set(result.scalars().all())
-
-        invalid = component_types - valid_types
-        if invalid:
-            raise ValueError(f"Invalid component types: {invalid}")
+        await _validate_component_types(db, {node.type for node in payload.graph.nodes})
 
         # 3️⃣ Prepare flow_json (JSON-safe only)
-
-        # ✅ Nodes → dicts
-        flow_nodes = [
-            {
-                "id": node.id,
-                "type": node.type,
-                "position": node.position,
-                "handles": [
-                    {
-                        "id": h.id,
-                        "type": h.type,
-                        "position": h.position,
-                    }
-                    for h in (node.handles or [])
-                ],
-            }
-            for node in payload.graph.nodes
-        ]
-
-        # ✅ Edges → dicts (NEW: Include handle references)
-        flow_edges = [
-            {
-                "source": edge.source,
-                "target": edge.target,
-                "sourceHandle": edge.sourceHandle,  # NEW
-                "targetHandle": edge.targetHandle,  # NEW
-            }
-            for edge in payload.graph.edges
-        ]
-
-        flow_json = {"nodes": flow_nodes, "edges": flow_edges}
+        flow_json = {
+            "nodes": [_flow_node(node) for node in payload.graph.nodes],
+            "edges": [_flow_edge(edge) for edge in payload.graph.edges],
+        }
 
         # 4️⃣ Update workflow
-        workflow.flow_json = flow_json
-        db.add(workflow)
+        graph_version = await _bump_graph_version(
+            db, workflow, flow_json, payload.graph_version
+        )
 
         # 5️⃣ Delete existing node configs
         await db.execute(
@@ -157,22 +258,114 @@ async def save_workflow_graph(db: AsyncSession, workflow_id: int, payload):
 
         # 6️⃣ Save new node configs WITH handles
         for node in payload.graph.nodes:
-            config = node.data.get("config", {})
-
-            node_config = WorkflowNodeConfig(
-                workflow_id=workflow_id,
-                node_id=node.id,
-                component_type=node.type,
-                config_values=config,
-                handles=[
-                    {
-                        "id": h.id,
-                        "type": h.type,
-                        "position": h.position,
-                    }
-                    for h in (node.handles or [])
-                ],
+            db.add(WorkflowNodeConfig(**_node_config_row(workflow_id, node)))
+
+    # Compiled graph for this workflow is now stale
+    graph_cache.invalidate(workflow_id)
+    return graph_version
+
+
+def _edge_key(edge: dict) -> tuple:
+    return (
+        edge["source"],
+        edge["target"],
+        edge.get("sourceHandle"),
+        edge.get("targetHandle"),
+    )
+
+
+async def apply_workflow_graph_delta(db: AsyncSession, workflow_id: int, delta):
+    """
+    Apply an incremental edit (see WorkflowGraphDeltaRequest).
+
+    Only the node config rows that actually changed are written (one bulk
+    upsert + one bulk delete); flow_json is patched in memory and written
+    with the version check. Returns the new graph_version.
+    """
+    async with db.begin():
+        result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
+        workflow = result.scalar_one_or_none()
+        if not workflow:
+            raise ValueError(f"Workflow with id {workflow_id} not found")
+        if workflow.graph_version != delta.base_version:
+            raise GraphVersionConflictError(
+                workflow_id, delta.base_version, workflow.graph_version
             )
-            db.add(node_config)
 
-        return workflow_id
+        await _validate_component_types(db, {node.type for node in delta.upsert_nodes})
+        removed = set(delta.remove_nodes)
+        both = removed & {node.id for node in delta.upsert_nodes}
+        if both:
+            raise ValueError(f"Nodes both upserted and removed: {both}")
+
+        # 1. Patch flow_json (nodes keep their order; new ones are appended)
+        flow_json = workflow.flow_json or {}
+        nodes = {n["id"]: n for n in flow_json.get("nodes", []) if n["id"] not in removed}
+        for node in delta.upsert_nodes:
+            nodes[node.id] = _flow_node(node)
+
+        removed_edges = {_edge_key(_flow_edge(e)) for e in delta.remove_edges}
+        edges = [
+            e
+            for e in flow_json.get("edges", [])
+            if _edge_key(e) not in removed_edges
+            and e["source"] not in removed
+            and e["target"] not in removed
+        ]
+        existing_edges = {_edge_key(e) for e in edges}
+        for edge in delta.add_edges:
+            flow_edge = _flow_edge(edge)
+            if _edge_key(flow_edge) not in existing_edges:
+                edges.append(flow_edge)
+                existing_edges.add(_edge_key(flow_edge))
+
+        missing = {
+            end for e in edges for end in (e["source"], e["target"]) if end not in nodes
+        }
+        if missing:
+            raise ValueError(f"Edges reference unknown nodes: {missing}")
+
+        # 2. Node configs: skip rows whose stored values are unchanged
+        # (a drag only changes position, which lives in flow_json)
+        rows = {node.id: _node_config_row(workflow_id, node) for node in delta.upsert_nodes}
+        if rows:
+            result = await db.execute(
+                select(
+                    WorkflowNodeConfig.node_id,
+                    WorkflowNodeConfig.component_type,
+                    WorkflowNodeConfig.config_values,
+                    WorkflowNodeConfig.handles,
+                ).where(
+                    WorkflowNodeConfig.workflow_id == workflow_id,
+                    WorkflowNodeConfig.node_id.in_(rows.keys()),
+                )
+            )
+            for node_id, component_type, config_values, handles in result.all():
+                row = rows[node_id]
+                if (component_type, config_values, handles) == (
+                    row["component_type"],
+                    row["config_values"],
+                    row["handles"],
+                ):
+                    del rows[node_id]
+
+        if rows:
+            await db.execute(_upsert_node_configs(db, list(rows.values())))
+        if removed:
+            await db.execute(
+                WorkflowNodeConfig.__table__.delete().where(
+                    WorkflowNodeConfig.workflow_id == workflow_id,
+                    WorkflowNodeConfig.node_id.in_(removed),
+                )
+            )
+
+        # 3. flow_json + version, conditional on nobody saving in between
+        graph_version = await _bump_graph_version(
+            db,
+            workflow,
+            {"nodes": list(nodes.values()), "edges": edges},
+            delta.base_version,
+        )
+
+    graph_cache.invalidate(workflow_id)
+    return graph_version
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.workflow import Workflow
@@ -7,11 +10,37 @@ from app.models.workflow import Workflow
 from app.models.workflow_node_config import WorkflowNodeConfig
 from app.models.component import Component
 from app.services.workflow_graph_service import get_workflow_graph
+from app.workflow.graph_cache import graph_cache
+from app.llm_models.vector_store import RetrievalResources, workflow_collection_name
+from app.models.file import File
+from pathlib import Path
+from app.workflow.executor import workflow_run_limiter
+from app.llm_models.embeddings import EMBEDDING_PROVIDERS
+from app.models.workflow_run import WorkflowRun
+from app.services.run_history_service import traced_run
+from app.workflow.tracing import RunTracer
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _check_embedding_provider(provider: str):
+    if provider is not None and provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(
+            f"Unknown embedding provider: {provider} "
+            f"(expected one of {', '.join(EMBEDDING_PROVIDERS)})"
+        )
 
 
-async def create_empty_workflow(db: AsyncSession, name: str, description: str):
+async def create_empty_workflow(
+    db: AsyncSession, name: str, description: str, embedding_provider: str = None
+):
+    _check_embedding_provider(embedding_provider)
     workflow = Workflow(
-        name=name, description=description, flow_json={"nodes": [], "edges": []}
+        name=name,
+        description=description,
+        flow_json={"nodes": [], "edges": []},
+        embedding_provider=embedding_provider,
     )
     db.add(workflow)
     await db.commit()
@@ -19,17 +48,36 @@ async def create_empty_workflow(db: AsyncSession, name: str, description: str):
     return workflow.id
 
 
-async def run_workflow(db: AsyncSession, workflow_id: int, message: str):
+async def get_compiled_workflow_graph(db: AsyncSession, workflow_id: int):
     """
-    Run a workflow with the given workflow_id and user message.
-    Fetches the workflow graph from DB and executes it.
+    Return the compiled LangGraph for a workflow.
+    Served from the in-memory graph cache when the stored graph_version and
+    embedding provider still match (one small query, so saves made through
+    other workers are seen); otherwise the graph is loaded from DB,
+    compiled and cached under that version.
     """
     from app.workflow.builder import build_graph_from_frontend
 
+    result = await db.execute(
+        select(Workflow.graph_version, Workflow.embedding_provider).where(
+            Workflow.id == workflow_id
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise ValueError(f"Workflow with id {workflow_id} not found")
+    version = tuple(row)
+
+    cached = graph_cache.get(workflow_id, version)
+    if cached is not None:
+        return cached
+
     # 1. Fetch workflow
     workflow = await get_workflow(db, workflow_id)
     if not workflow:
         raise ValueError(f"Workflow with id {workflow_id} not found")
+    # The version of what is actually loaded (a save may have landed in between)
+    version = (workflow.graph_version, workflow.embedding_provider)
 
     # 2. Get the saved workflow graph
     workflow_graph_data = await get_workflow_graph(db, workflow_id)
@@ -46,22 +94,171 @@ async def run_workflow(db: AsyncSession, workflow_id: int, message: str):
 
     # 4. Build the LangGraph from the saved workflow
     flow_dict = {"nodes": nodes, "edges": edges}
-    app_graph = build_graph_from_frontend(flow_dict)
+    app_graph = build_graph_from_frontend(flow_dict, workflow.embedding_provider)
 
-    # 5. Prepare initial state with user message
-    initial_state = {
+    graph_cache.put(workflow_id, version, app_graph)
+    return app_graph
+
+
+def _initial_state(message: str, query_embedding: list = None) -> dict:
+    return {
         "input_query": message,
         "current_content": "",
         "messages": [],
-        "context": None,
+        "contexts": {},
+        "query_embedding": query_embedding,
         "final_output": None,
     }
 
+
+def _run_config(
+    workflow_id: int, resources: RetrievalResources, tracer: RunTracer = None
+) -> dict:
+    return {
+        "configurable": {
+            "workflow_id": workflow_id,
+            "retrieval": resources,
+            "tracer": tracer,
+        }
+    }
+
+
+async def run_workflow(
+    db: AsyncSession,
+    workflow_id: int,
+    message: str,
+    resources: RetrievalResources,
+):
+    """
+    Run a workflow with the given workflow_id and user message.
+    Fetches the workflow graph from DB (or the graph cache) and executes it.
+    Returns (final output, run id); the run is recorded in the run history.
+    """
+    app_graph = await get_compiled_workflow_graph(db, workflow_id)
+
+    # 5. Prepare initial state with user message
+    initial_state = _initial_state(message)
+
     # 6. Execute the workflow graph
-    result = await app_graph.ainvoke(initial_state)
+    async with workflow_run_limiter, traced_run(workflow_id, message, "run") as tracer:
+        result = await app_graph.ainvoke(
+            initial_state, config=_run_config(workflow_id, resources, tracer)
+        )
 
     # 7. Return the final output
-    return result.get("final_output")
+    return result.get("final_output"), tracer.run_id
+
+
+async def stream_workflow(
+    app_graph, workflow_id: int, message: str, resources: RetrievalResources
+):
+    """
+    Execute a compiled workflow graph and yield (event, data) tuples as it runs:
+    node_start / node_end per node, token for each LLM chunk, and a final
+    "final" event carrying the output and the run id.
+    """
+    async with workflow_run_limiter, traced_run(workflow_id, message, "stream") as tracer:
+        config = _run_config(workflow_id, resources, tracer)
+        async for event in app_graph.astream_events(
+            _initial_state(message), config=config, version="v2"
+        ):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_chat_model_stream":
+                token = event["data"]["chunk"].content
+                if token:
+                    yield "token", {"node": node, "content": token}
+
+            elif kind == "on_chain_start" and node and event["name"] == node:
+                yield "node_start", {"node": node}
+
+            elif kind == "on_chain_end" and node and event["name"] == node:
+                yield "node_end", {"node": node}
+
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Root graph finished
+                output = event["data"].get("output") or {}
+                yield "final", {
+                    "response": output.get("final_output"),
+                    "run_id": tracer.run_id,
+                }
+
+
+async def run_workflow_batch(
+    app_graph,
+    workflow_id: int,
+    messages: list,
+    resources: RetrievalResources,
+    concurrency: int,
+    embedding_provider: str = None,
+):
+    """
+    Run many messages through one compiled graph with bounded concurrency.
+    Yields one result dict per message, in input order, as soon as it (and
+    every message before it) has finished.
+    """
+    from app.workflow.builder import graph_component_types
+
+    # Queries are embedded a chunk at a time (one request per chunk instead
+    # of one per run), when the first run of the chunk is scheduled; the
+    # first results stream without waiting for the whole batch.
+    chunk_size = settings.BATCH_RUN_EMBED_BATCH_SIZE
+    chunks = {}
+    embedding_function = None
+    if "knowledgeBase" in graph_component_types(app_graph):
+        embedding_function = resources.get_embedding_function(embedding_provider)
+
+    async def embed_chunk(start: int):
+        texts = messages[start : start + chunk_size]
+        try:
+            return await embedding_function.aembed_documents(texts)
+        except Exception:
+            # Runs embed their own query instead
+            logger.warning("Batch query embedding failed", exc_info=True)
+            return [None] * len(texts)
+
+    async def query_embedding(index: int):
+        if embedding_function is None:
+            return None
+        start = index - index % chunk_size
+        if start not in chunks:
+            chunks[start] = asyncio.create_task(embed_chunk(start))
+        # shield: one cancelled run must not cancel the chunk for the others
+        return (await asyncio.shield(chunks[start]))[index - start]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index: int):
+        async with semaphore, workflow_run_limiter:
+            response = error = run_id = None
+            try:
+                embedding = await query_embedding(index)
+                async with traced_run(workflow_id, messages[index], "batch") as tracer:
+                    run_id = tracer.run_id
+                    result = await app_graph.ainvoke(
+                        _initial_state(messages[index], embedding),
+                        config=_run_config(workflow_id, resources, tracer),
+                    )
+                response = result.get("final_output")
+            except Exception as e:
+                error = str(e)
+            return {
+                "index": index,
+                "message": messages[index],
+                "response": response,
+                "error": error,
+                "run_id": run_id,
+            }
+
+    tasks = [asyncio.create_task(run_one(i)) for i in range(len(messages))]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        # Client went away: don't keep burning LLM calls
+        for task in [*tasks, *chunks.values()]:
+            task.cancel()
 
 
 async def get_workflow(db: AsyncSession, workflow_id: int):
@@ -72,3 +269,79 @@ async def get_workflow(db: AsyncSession, workflow_id: int):
 async def get_all_workflows(db: AsyncSession, skip: int = 0, limit: int = 100):
     result = await db.execute(select(Workflow).offset(skip).limit(limit))
     return result.scalars().all()
+
+
+async def set_embedding_provider(
+    db: AsyncSession,
+    workflow_id: int,
+    embedding_provider: str,
+    resources: RetrievalResources,
+):
+    """
+    Switch a workflow to another embedding provider.
+
+    Vectors from different models are not comparable (nor, usually, of the
+    same dimension), so the workflow's collection is dropped and its files
+    are reset to be ingested again. A job still running with the old
+    provider sees its claim gone and aborts before its next write (see
+    IngestionQueue._check_claim). Returns the files to re-ingest, or None
+    if the workflow does not exist.
+    """
+    _check_embedding_provider(embedding_provider)
+    workflow = await get_workflow(db, workflow_id)
+    if not workflow:
+        return None
+
+    result = await db.execute(select(File).filter(File.workflow_id == workflow_id))
+    files = result.scalars().all()
+    if workflow.embedding_provider == embedding_provider:
+        return files
+
+    workflow.embedding_provider = embedding_provider
+    for f in files:
+        f.is_ingested = False
+        f.ingested_hash = None
+        f.ingest_status = "pending"
+        f.ingest_progress = 0.0
+        f.ingest_error = None
+        f.claimed_by = None
+    await db.commit()
+
+    graph_cache.invalidate(workflow_id)
+    resources.delete_collection(workflow_collection_name(workflow_id))
+    return files
+
+
+async def delete_workflow(
+    db: AsyncSession, workflow_id: int, resources: RetrievalResources
+) -> bool:
+    """
+    Delete a workflow with everything it owns: node configs, run history,
+    uploaded files (records + disk) and its vector collection.
+    """
+    workflow = await get_workflow(db, workflow_id)
+    if not workflow:
+        return False
+
+    result = await db.execute(select(File).filter(File.workflow_id == workflow_id))
+    files = result.scalars().all()
+    for f in files:
+        file_path = Path(f.filepath)
+        if file_path.exists():
+            file_path.unlink()
+        await db.delete(f)
+
+    await db.execute(
+        WorkflowNodeConfig.__table__.delete().where(
+            WorkflowNodeConfig.workflow_id == workflow_id
+        )
+    )
+    await db.execute(
+        WorkflowRun.__table__.delete().where(WorkflowRun.workflow_id == workflow_id)
+    )
+    await db.delete(workflow)
+    await db.commit()
+
+    graph_cache.invalidate(workflow_id)
+    resources.delete_collection(workflow_collection_name(workflow_id))
+    return True
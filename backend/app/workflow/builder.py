@@ -1,5 +1,10 @@
+import functools
+import inspect
+
 from langgraph.graph import StateGraph, END
 from app.workflow.state import GraphState
+from app.workflow.executor import as_async_node
+from app.workflow.tracing import traced_node
 from app.workflow.nodes import (
     node_user_query,
     node_knowledge_base,
@@ -14,20 +19,112 @@ NODE_MAP = {
     "output": node_output,
 }
 
-def build_graph_from_frontend(flow: dict):
-    workflow = StateGraph(GraphState)
+def bind_node_config(fn, node_config: dict, **build_args):
+    """
+    Per-node closure over the node's saved config values (top_k, model, ...)
+    and values known when the graph is built (embedding_provider, node_id,
+    upstream, knowledge_bases), for node functions that accept those
+    arguments.
+    """
+    params = inspect.signature(fn).parameters
+    bound = {k: v for k, v in build_args.items() if k in params}
+    if "node_config" in params:
+        bound["node_config"] = node_config or {}
+    return functools.partial(fn, **bound) if bound else fn
 
-    nodes = flow["nodes"]
-    edges = flow["edges"]
 
-    for n in nodes:
-        workflow.add_node(n["id"], NODE_MAP[n["type"]])
+def _knowledge_base_ancestors(node_id: str, nodes: list, edges: list) -> list:
+    """knowledgeBase nodes with a path to node_id (whose contexts it may read)."""
+    incoming = {}
+    for e in edges:
+        incoming.setdefault(e["target"], []).append(e["source"])
+
+    seen, stack = set(), [node_id]
+    while stack:
+        for src in incoming.get(stack.pop(), []):
+            if src not in seen:
+                seen.add(src)
+                stack.append(src)
+    return [n["id"] for n in nodes if n["type"] == "knowledgeBase" and n["id"] in seen]
+
+
+def _back_edges(entry: str, edges: list):
+    """
+    DFS from the entry node. Returns the edges that close a cycle (loops stay
+    plain edges; only forward edges take part in joins) and the set of nodes
+    reachable from the entry.
+    """
+    adjacency = {}
+    for e in edges:
+        adjacency.setdefault(e["source"], []).append(e["target"])
+
+    back, on_stack, visited = set(), set(), set()
+
+    def dfs(node: str):
+        visited.add(node)
+        on_stack.add(node)
+        for nxt in adjacency.get(node, []):
+            if nxt in on_stack:
+                back.add((node, nxt))
+            elif nxt not in visited:
+                dfs(nxt)
+        on_stack.discard(node)
+
+    dfs(entry)
+    return back, visited
+
 
+def _add_edges(workflow: StateGraph, entry: str, edges: list):
+    """
+    Sibling branches (e.g. two knowledgeBase nodes fed by the same query) run
+    concurrently in the same step. A node with several forward inputs gets a
+    join edge, so it runs once after all of its branches finished instead of
+    once per branch; the state reducers merge what the branches wrote.
+    """
+    back, reachable = _back_edges(entry, edges)
+
+    sources = {}
     for e in edges:
-        workflow.add_edge(e["source"], e["target"])
+        src, tgt = e["source"], e["target"]
+        if (src, tgt) in back or src not in reachable:
+            workflow.add_edge(src, tgt)
+        elif src not in sources.setdefault(tgt, []):
+            sources[tgt].append(src)
+
+    for tgt, srcs in sources.items():
+        workflow.add_edge(srcs[0] if len(srcs) == 1 else srcs, tgt)
+
+
+def build_graph_from_frontend(flow: dict, embedding_provider: str = None):
+    workflow = StateGraph(GraphState)
+
+    nodes = flow["nodes"]
+    edges = flow["edges"]
 
     # Entry = userQuery
     entry = next(n["id"] for n in nodes if n["type"] == "userQuery")
+
+    for n in nodes:
+        upstream = [e["source"] for e in edges if e["target"] == n["id"]]
+        # Sync nodes run in the bounded thread pool, never on the event loop
+        node_fn = as_async_node(
+            bind_node_config(
+                NODE_MAP[n["type"]],
+                n.get("config"),
+                embedding_provider=embedding_provider,
+                node_id=n["id"],
+                upstream=upstream,
+                knowledge_bases=_knowledge_base_ancestors(n["id"], nodes, edges),
+            )
+        )
+        workflow.add_node(
+            n["id"],
+            # One span per execution when the run carries a tracer
+            traced_node(node_fn, n["id"], n["type"]),
+            metadata={"component_type": n["type"]},
+        )
+
+    _add_edges(workflow, entry, edges)
     workflow.set_entry_point(entry)
 
     # END only from output nodes
@@ -36,3 +133,13 @@ def build_graph_from_frontend(flow: dict):
             workflow.add_edge(n["id"], END)
 
     return workflow.compile()
+
+
+def graph_component_types(app_graph) -> set:
+    """Component types (userQuery, knowledgeBase, ...) present in a compiled graph."""
+    return {
+        spec.metadata["component_type"]
+        for spec in app_graph.builder.nodes.values()
+        if spec.metadata and "component_type" in spec.metadata
+    }
+
@@ -79,9 +79,23 @@ COMPONENT_DEFINITIONS = [
                 },
                 {
                     "name": "score_threshold",
-                    "label": "Score Threshold",
+                    # Minimum cosine similarity of a vector hit
+                    "label": "Score Threshold (cosine similarity, 0-1)",
                     "type": "number",
-                    "default": 0.75,
+                    "default": 0.3,
+                },
+                {
+                    "name": "retrieval_mode",
+                    "label": "Retrieval Mode",
+                    "type": "select",
+                    "options": ["hybrid", "vector", "keyword"],
+                    "default": "hybrid",
+                },
+                {
+                    "name": "max_context_tokens",
+                    "label": "Max Context Tokens",
+                    "type": "number",
+                    "default": 2000,
                 },
             ]
         },
@@ -114,4 +128,14 @@ COMPONENT_DEFINITIONS = [
             {"id": "left-target", "type": "target", "position": "left"}
         ],
     },
-]
\ No newline at end of file
+]
+
+
+def get_field_default(component_type: str, field_name: str):
+    """Default value of a ui_schema field, as declared above."""
+    for comp in COMPONENT_DEFINITIONS:
+        if comp["type"] == component_type:
+            for field in comp["ui_schema"]["fields"]:
+                if field["name"] == field_name:
+                    return field.get("default")
+    return None
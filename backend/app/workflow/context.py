@@ -0,0 +1,85 @@
+from functools import lru_cache
+from typing import List, Tuple
+
+import tiktoken
+
+from config import settings
+
+CHUNK_SEPARATOR = "\n\n"
+
+# Chunks are split with chunk_overlap=200, so neighbours share up to ~200 chars
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 300
+
+# Don't bother appending a truncated tail shorter than this
+MIN_TRUNCATED_TOKENS = 32
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model_name: str):
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model_name: str = None) -> int:
+    encoding = get_encoding(model_name or settings.TIKTOKEN_MODEL_NAME)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    longest = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _strip_overlaps(text: str, selected: List[str]) -> str:
+    for other in selected:
+        if text in other:
+            return ""
+        head = _overlap(other, text)
+        if head:
+            text = text[head:]
+        tail = _overlap(text, other)
+        if tail:
+            text = text[:-tail]
+    return text.strip()
+
+
+def pack_context(
+    chunks: List[Tuple[str, float]], max_tokens: int, model_name: str = None
+) -> str:
+    """
+    Assemble retrieved chunks into a prompt context within a token budget.
+
+    Chunks are taken best score first; duplicates and the text shared with
+    already selected neighbours (splitter overlap) are dropped, and the last
+    chunk that does not fit is truncated to the remaining budget.
+    """
+    encoding = get_encoding(model_name or settings.TIKTOKEN_MODEL_NAME)
+    separator_tokens = len(encoding.encode(CHUNK_SEPARATOR))
+
+    selected: List[str] = []
+    used = 0
+    for text, _score in sorted(chunks, key=lambda c: c[1], reverse=True):
+        text = _strip_overlaps(text.strip(), selected)
+        if not text:
+            continue
+
+        cost = separator_tokens if selected else 0
+        tokens = encoding.encode(text, disallowed_special=())
+        remaining = max_tokens - used - cost
+        if len(tokens) <= remaining:
+            selected.append(text)
+            used += cost + len(tokens)
+            continue
+
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            selected.append(encoding.decode(tokens[:remaining]))
+        break
+
+    return CHUNK_SEPARATOR.join(selected)
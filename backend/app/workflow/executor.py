@@ -0,0 +1,56 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.runnables import RunnableConfig
+
+from config import settings
+
+# Bounded pool for node functions that are still synchronous (blocking I/O).
+# Keeps a slow sync node from stalling the event loop without spawning
+# an unbounded number of threads.
+_node_executor = ThreadPoolExecutor(
+    max_workers=settings.NODE_THREAD_POOL_SIZE,
+    thread_name_prefix="workflow-node",
+)
+
+# Caps how many workflow runs execute at once in this worker process
+workflow_run_limiter = asyncio.Semaphore(settings.MAX_CONCURRENT_RUNS)
+
+
+async def run_in_node_executor(fn, *args):
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _node_executor, functools.partial(ctx.run, fn, *args)
+    )
+
+
+def as_async_node(fn):
+    """
+    Return an async version of a node function.
+    Coroutine functions are returned unchanged; sync functions are offloaded
+    to the bounded node thread pool.
+    """
+    if inspect.iscoroutinefunction(fn):
+        return fn
+
+    if "config" in inspect.signature(fn).parameters:
+
+        async def _node(state, config: RunnableConfig):
+            return await run_in_node_executor(fn, state, config)
+
+    else:
+
+        async def _node(state):
+            return await run_in_node_executor(fn, state)
+
+    _node.__name__ = getattr(fn, "__name__", type(fn).__name__)
+    _node.__doc__ = fn.__doc__
+    return _node
+
+
+def shutdown_node_executor():
+    _node_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from config import settings
+
+
+class CompiledGraphCache:
+    """
+    Bounded LRU cache of compiled LangGraph apps.
+
+    Entries are keyed by (workflow_id, version), where the version is read
+    from the database on every lookup (Workflow.graph_version plus the
+    embedding provider, see get_compiled_workflow_graph). A save handled
+    by another worker therefore changes the version and misses here, even
+    though only the saving process calls invalidate().
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, Hashable], Any]" = OrderedDict()
+        self._latest: Dict[int, Hashable] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, workflow_id: int, version: Hashable) -> Optional[Any]:
+        key = (workflow_id, version)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def put(self, workflow_id: int, version: Hashable, app_graph: Any) -> None:
+        # Drop any stale version of this workflow first
+        old_version = self._latest.get(workflow_id)
+        if old_version is not None and old_version != version:
+            self._entries.pop((workflow_id, old_version), None)
+
+        key = (workflow_id, version)
+        self._entries[key] = app_graph
+        self._entries.move_to_end(key)
+        self._latest[workflow_id] = version
+
+        while len(self._entries) > self.max_size:
+            (evicted_id, evicted_version), _ = self._entries.popitem(last=False)
+            if self._latest.get(evicted_id) == evicted_version:
+                del self._latest[evicted_id]
+            self.evictions += 1
+
+    def invalidate(self, workflow_id: int) -> None:
+        version = self._latest.pop(workflow_id, None)
+        if version is not None:
+            self._entries.pop((workflow_id, version), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._latest.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+graph_cache = CompiledGraphCache(max_size=settings.GRAPH_CACHE_SIZE)
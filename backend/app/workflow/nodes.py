@@ -1,9 +1,18 @@
-from app.workflow.state import GraphState
-from app.llm_models.embeddings import get_huggingface_embedding_function, get_openai_embedding_function
+import asyncio
+import logging
+
+from app.workflow.state import GraphState, NO_RESULTS_FLAG
+from app.llm_models.vector_store import RetrievalResources, workflow_collection_name
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
+from app.llm_models.chat_models import get_chat_model
+from app.llm_models.response_cache import response_cache
+from app.workflow.components_registry import get_field_default
+from app.workflow.context import count_tokens, pack_context
+from app.workflow.tracing import trace_add, trace_annotate
+from app.core.metrics import LLM_REQUEST_DURATION, LLM_REQUEST_ERRORS
+from app.llm_models.keyword_index import is_keyword_query, reciprocal_rank_fusion
 from config import settings
-from langchain_chroma import Chroma
 
 # llm used while development
 # llm = ChatOpenAI(
@@ -14,105 +23,310 @@ from langchain_chroma import Chroma
 #     temperature=settings.TEMPERATURE,
 # )
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0.7,
-    api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
+
+# Provider comes from settings.LLM_PROVIDER ("fake" for local streaming tests)
+llm = get_chat_model()
+
+def get_retrieval_resources(config: RunnableConfig) -> RetrievalResources:
+    """
+    Retrieval clients are injected per run via config["configurable"]["retrieval"].
+    """
+    resources = (config or {}).get("configurable", {}).get("retrieval")
+    if resources is None:
+        raise RuntimeError("Retrieval resources were not provided to the workflow run")
+    return resources
+
+
+async def embed_query(
+    state: GraphState, query: str, config: RunnableConfig, embedding_provider: str = None
+):
+    # Batch runs embed all queries in one request up front
+    query_embedding = state.get("query_embedding")
+    if query_embedding is None or query != state.get("input_query"):
+        embedding_function = get_retrieval_resources(config).get_embedding_function(
+            embedding_provider
+        )
+        query_embedding = await embedding_function.aembed_query(query)
+        trace_add(
+            embedding_tokens=count_tokens(query, settings.EMBEDDING_TIKTOKEN_MODEL_NAME)
+        )
+    else:
+        trace_annotate(query_embedding="precomputed")
+    return query_embedding
 
-NO_RESULTS_FLAG = "__NO_SEARCH_RESULTS__"
 
-# Constants for vector database
-CHROMA_PATH = str(settings.CHROMA_DB_PATH)
-MAIN_COLLECTION_NAME = "app_knowledge_base"
+def get_config_value(node_config: dict, component_type: str, name: str, cast):
+    """
+    User-filled node config value, falling back to the component's default.
+    The UI may send numbers as strings, hence the cast.
+    """
+    value = (node_config or {}).get(name)
+    if value is None or value == "":
+        value = get_field_default(component_type, name)
+    return cast(value)
 
 
-def node_user_query(state: GraphState) -> GraphState:
-    print("--- EXECUTE: USER QUERY ---")
+def _model_params(model) -> dict:
+    return {
+        "class": type(model).__name__,
+        "model": getattr(model, "model_name", None) or getattr(model, "model", None),
+        "temperature": getattr(model, "temperature", None),
+    }
+
+
+async def generate(
+    prompt: ChatPromptTemplate,
+    variables: dict,
+    state: GraphState,
+    config: RunnableConfig,
+    embedding_provider: str = None,
+) -> str:
+    """
+    Render the prompt and call the chat model, going through the response
+    cache (exact tier, then semantic tier if enabled) when one is configured.
+    """
+    prompt_value = await prompt.ainvoke(variables)
+    if response_cache is None:
+        return await _call_llm(prompt_value)
+
+    key = response_cache.make_key(prompt_value.to_string(), _model_params(llm))
+    namespace = embedding = None
+    if response_cache.semantic_enabled:
+        workflow_id = (config or {}).get("configurable", {}).get("workflow_id")
+        namespace = response_cache.make_namespace(workflow_id, variables.get("context"))
+        embedding = await embed_query(
+            state, variables["input"], config, embedding_provider
+        )
+
+    cached, tier = await response_cache.alookup_tier(key, namespace, embedding)
+    trace_annotate(response_cache=tier or "miss")
+    if cached is not None:
+        logger.debug("Response cache hit (%s)", tier)
+        trace_add(cache_hits=1)
+        return cached
+
+    answer = await _call_llm(prompt_value)
+    await response_cache.astore(key, answer, namespace, embedding)
+    return answer
+
+
+async def _call_llm(prompt_value) -> str:
+    model = _model_params(llm)["model"] or _model_params(llm)["class"]
+    try:
+        with LLM_REQUEST_DURATION.time(model=model):
+            message = await llm.ainvoke(prompt_value)
+    except Exception:
+        LLM_REQUEST_ERRORS.inc(model=model)
+        raise
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        trace_add(
+            llm_prompt_tokens=usage.get("input_tokens", 0),
+            llm_completion_tokens=usage.get("output_tokens", 0),
+        )
+    else:
+        # Provider reported no usage (e.g. fake model): estimate with tiktoken
+        trace_add(
+            llm_prompt_tokens=count_tokens(prompt_value.to_string()),
+            llm_completion_tokens=count_tokens(message.content),
+        )
+        trace_annotate(tokens_estimated=True)
+    return message.content
+
+
+async def node_user_query(state: GraphState) -> GraphState:
+    logger.debug("Execute: user query")
     return {
         "current_content": state["input_query"]
     }
 
 
-def node_knowledge_base(state: GraphState) -> GraphState:
-    print("--- EXECUTE: KNOWLEDGE BASE (RAG) ---")
+async def node_knowledge_base(
+    state: GraphState,
+    config: RunnableConfig,
+    node_config: dict = None,
+    embedding_provider: str = None,
+    node_id: str = None,
+) -> GraphState:
+    logger.debug("Execute: knowledge base")
     
     query = state.get("current_content", "")
     # Optional: State can hold a filter if the user selected a specific file
     filter_filename = state.get("filter_filename", None)
+
+    # Per-node settings saved in WorkflowNodeConfig.config_values
+    top_k = get_config_value(node_config, "knowledgeBase", "top_k", int)
+    score_threshold = get_config_value(
+        node_config, "knowledgeBase", "score_threshold", float
+    )
+    max_context_tokens = get_config_value(
+        node_config, "knowledgeBase", "max_context_tokens", int
+    )
     
-    # 1. Initialize Embeddings (Must match ingestion model)
-    embedding_function = get_openai_embedding_function()
-    ## USING FREE MODEL FOR TESTING
-    embedding_function_free = get_huggingface_embedding_function()
-    
-    # 2. Connect to existing ChromaDB
-    vector_store = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embedding_function,
-        collection_name=MAIN_COLLECTION_NAME
+    retrieval_mode = get_config_value(
+        node_config, "knowledgeBase", "retrieval_mode", str
     )
     
+    # 1. Reuse the pooled vector store (embedding model matches ingestion)
+    resources = get_retrieval_resources(config)
+    workflow_id = config["configurable"]["workflow_id"]
+    collection_name = workflow_collection_name(workflow_id)
+    
     # 3. Prepare search arguments
-    search_kwargs = {}
+    search_filter = None
     if filter_filename:
-        print(f"   --- FILTERING BY: {filter_filename} ---")
-        search_kwargs["filter"] = {"filename": filter_filename}
+        logger.debug("Filtering by filename %s", filter_filename)
+        search_filter = {"filename": filter_filename}
     
-    # 4. Perform Similarity Search
-    # k=3 fetches the top 3 most relevant chunks
-    results = vector_store.similarity_search(
-        query, 
-        k=3,
-        **search_kwargs
-    )
+    # 4. Keyword (BM25) search: local, no network round trip. Loading and
+    # searching run in a thread (the index lock is shared with ingestion)
+    keyword_results = []
+    if retrieval_mode in ("keyword", "hybrid"):
+        keyword_index = await asyncio.to_thread(
+            resources.get_keyword_index, collection_name
+        )
+        keyword_results = await asyncio.to_thread(
+            keyword_index.search, query, k=top_k, filter=search_filter
+        )
+
+    # 5. Vector search, skipped for pure identifier queries the index answered
+    vector_results = []
+    if retrieval_mode == "vector" or (
+        retrieval_mode == "hybrid"
+        and not (keyword_results and is_keyword_query(query))
+    ):
+        vector_results = await _vector_search(
+            state,
+            query,
+            config,
+            embedding_provider,
+            collection_name,
+            top_k,
+            score_threshold,
+            search_filter,
+        )
+
+    if retrieval_mode == "hybrid" and keyword_results and vector_results:
+        results = reciprocal_rank_fusion(vector_results, keyword_results)[:top_k]
+    else:
+        results = vector_results or keyword_results
     
-    # 5. Process Results
+    trace_add(chunks_retrieved=len(results))
+    trace_annotate(
+        retrieval_mode=retrieval_mode,
+        vector_hits=len(vector_results),
+        keyword_hits=len(keyword_results),
+    )
+
+    # 6. Process Results
     if not results:
-        print("   No relevant documents found.")
-        return {"context": NO_RESULTS_FLAG}
+        logger.debug(
+            "No documents found (%s, threshold %s)", retrieval_mode, score_threshold
+        )
+        return {"contexts": {node_id: NO_RESULTS_FLAG}}
     
-    # Combine content from the retrieved docs
-    context_text = "\n\n".join([doc.page_content for doc in results])
+    # Combine content from the retrieved docs: best first, overlap removed,
+    # capped at the node's token budget
+    context_text = pack_context(
+        [(doc.page_content, score) for doc, score in results], max_context_tokens
+    )
+    trace_annotate(context_tokens=count_tokens(context_text))
     
-    print(f"   Retrieved {len(results)} chunks.")
-    return {"context": context_text}
+    logger.debug(
+        "Retrieved %d chunks (%s: %d vector, %d keyword)",
+        len(results),
+        retrieval_mode,
+        len(vector_results),
+        len(keyword_results),
+    )
+    return {"contexts": {node_id: context_text}}
 
 
-def node_llm_engine(state: GraphState) -> GraphState:
-    print("--- EXECUTE: LLM ENGINE ---")
+async def _vector_search(
+    state,
+    query,
+    config,
+    embedding_provider,
+    collection_name,
+    top_k,
+    score_threshold,
+    search_filter,
+):
+    """
+    Embed with the native async client, then search the local index in a
+    thread (Chroma itself is sync). Distances are converted to relevance
+    (cosine similarity, see relevance_from_distance) and pruned at
+    score_threshold.
+    """
+    resources = get_retrieval_resources(config)
+    vector_store = resources.get_vector_store(collection_name, embedding_provider)
+    query_embedding = await embed_query(state, query, config, embedding_provider)
+    scored = await asyncio.to_thread(
+        vector_store.similarity_search_by_vector_with_relevance_scores,
+        query_embedding,
+        k=top_k,
+        filter=search_filter,
+    )
+    relevance = await asyncio.to_thread(resources.get_relevance_fn, collection_name)
+    scored = [(doc, relevance(distance)) for doc, distance in scored]
+    return [(doc, score) for doc, score in scored if score >= score_threshold]
+
+
+async def node_llm_engine(
+    state: GraphState,
+    config: RunnableConfig,
+    embedding_provider: str = None,
+    node_id: str = None,
+    knowledge_bases: list = None,
+) -> GraphState:
+    logger.debug("Execute: llm engine")
 
     query = state.get("current_content", "")
-    context = state.get("context")
+    # Only the knowledgeBase nodes upstream of this one: parallel branches
+    # never see each other's documents
+    contexts = state.get("contexts") or {}
+    ran = [contexts[k] for k in knowledge_bases or [] if contexts.get(k)]
+    found = list(dict.fromkeys(c for c in ran if c != NO_RESULTS_FLAG))
+    context = "\n\n".join(found)
     existing = state.get("llm_response")
 
     # RAG success
-    if context and context != NO_RESULTS_FLAG:
+    if context:
         prompt = ChatPromptTemplate.from_template(
             "Answer ONLY using this context:\n{context}\n\nQuestion: {input}"
         )
-        return {
-            "llm_response": (prompt | llm).invoke(
-                {"context": context, "input": query}
-            ).content
-        }
+        answer = await generate(
+            prompt,
+            {"context": context, "input": query},
+            state,
+            config,
+            embedding_provider,
+        )
 
     # RAG failed
-    if context == NO_RESULTS_FLAG:
+    elif ran:
         if existing:
             return {}
-        return {
-            "llm_response": "I checked the Knowledge Base but couldn’t find relevant information."
-        }
+        answer = "I checked the Knowledge Base but couldn’t find relevant information."
 
     # General chat
-    prompt = ChatPromptTemplate.from_template(
-        "You are a helpful assistant. Question: {input}"
-    )
-    return {
-        "llm_response": (prompt | llm).invoke({"input": query}).content
-    }
+    else:
+        prompt = ChatPromptTemplate.from_template(
+            "You are a helpful assistant. Question: {input}"
+        )
+        answer = await generate(
+            prompt, {"input": query}, state, config, embedding_provider
+        )
+
+    return {"llm_response": answer, "llm_responses": {node_id: answer}}
+
 
-def node_output(state: GraphState) -> GraphState:
+async def node_output(state: GraphState, upstream: list = None) -> GraphState:
+    # Answers of the llm nodes wired into this output; parallel branches
+    # are joined, a single chain gives its last answer as before
+    responses = state.get("llm_responses") or {}
+    answers = [responses[n] for n in upstream or [] if responses.get(n)]
     return {
-        "final_output": state.get("llm_response")
+        "final_output": "\n\n".join(answers) if answers else state.get("llm_response")
     }
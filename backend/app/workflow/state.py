@@ -1,6 +1,31 @@
-from typing import TypedDict, List, Optional
+from typing import Annotated, Dict, TypedDict, List, Optional
 from langchain_core.messages import BaseMessage
 
+# Written by a knowledgeBase node that found nothing
+NO_RESULTS_FLAG = "__NO_SEARCH_RESULTS__"
+
+
+# --- Reducers ---
+# Sibling branches run in the same step and may write the same key;
+# these decide how their values combine instead of raising.
+def merge_text(left: Optional[str], right: Optional[str]) -> Optional[str]:
+    """Append right to left, skipping empty and repeated values."""
+    if not right or right == left:
+        return left
+    if not left:
+        return right
+    return f"{left}\n\n{right}"
+
+
+def last_value(left, right):
+    """Keep the most recent non-None write."""
+    return left if right is None else right
+
+
+def merge_dicts(left: Optional[dict], right: Optional[dict]) -> dict:
+    return {**(left or {}), **(right or {})}
+
+
 class GraphState(TypedDict, total=False):
     # Immutable
     input_query: str
@@ -8,12 +33,17 @@ class GraphState(TypedDict, total=False):
     # Baton
     current_content: str
 
-    # RAG sidecar
-    context: Optional[str]
+    # RAG sidecar: context (or NO_RESULTS_FLAG) per knowledgeBase node id;
+    # llm nodes read only the knowledgeBase nodes upstream of them
+    contexts: Annotated[Dict[str, str], merge_dicts]
+    # Precomputed embedding of input_query (set by batch runs)
+    query_embedding: Optional[List[float]]
 
     # LLM memory
     messages: List[BaseMessage]
 
     # Intermediate & final
-    llm_response: Optional[str]
-    final_output: Optional[str]
+    llm_response: Annotated[Optional[str], last_value]
+    # Answer per llm node id; output nodes read their own inputs from it
+    llm_responses: Annotated[Dict[str, str], merge_dicts]
+    final_output: Annotated[Optional[str], merge_text]
@@ -0,0 +1,143 @@
+import inspect
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from app.core.metrics import WORKFLOW_NODE_DURATION
+
+# Numeric span details that are summed into the run totals
+COUNTERS = (
+    "llm_prompt_tokens",
+    "llm_completion_tokens",
+    "embedding_tokens",
+    "cache_hits",
+    "chunks_retrieved",
+)
+
+# Span of the node currently executing in this task (each node runs in its
+# own task, so sibling branches never see each other's span)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """Timing and details of one node execution."""
+
+    def __init__(self, node_id: str, component_type: str, offset_ms: float):
+        self.node_id = node_id
+        self.component_type = component_type
+        self.offset_ms = offset_ms  # start, relative to the run start
+        self.started_at = datetime.utcnow()
+        self.ended_at = None
+        self.latency_ms = None
+        self.error = None
+        self.details = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "component_type": self.component_type,
+            "offset_ms": round(self.offset_ms, 3),
+            "started_at": self.started_at.isoformat(),
+            "ended_at": self.ended_at.isoformat() if self.ended_at else None,
+            "latency_ms": round(self.latency_ms, 3) if self.latency_ms is not None else None,
+            "error": self.error,
+            "details": self.details,
+        }
+
+
+class RunTracer:
+    """
+    Collects one span per node execution of a workflow run.
+
+    Passed to nodes through config["configurable"]["tracer"]; traced_node
+    opens the span, and node code adds details with trace_add /
+    trace_annotate without needing a reference to the tracer.
+    """
+
+    def __init__(self, workflow_id: int, input_query: str, mode: str = "run"):
+        self.run_id = uuid.uuid4().hex
+        self.workflow_id = workflow_id
+        self.input_query = input_query
+        self.mode = mode
+        self.started_at = datetime.utcnow()
+        self.status = "running"
+        self.error = None
+        self.latency_ms = None
+        self.spans: List[Span] = []
+        self._t0 = time.perf_counter()
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    @asynccontextmanager
+    async def span(self, node_id: str, component_type: str):
+        span = Span(node_id, component_type, self._elapsed_ms())
+        self.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = str(e) or type(e).__name__
+            raise
+        finally:
+            span.ended_at = datetime.utcnow()
+            span.latency_ms = self._elapsed_ms() - span.offset_ms
+            _current_span.reset(token)
+            WORKFLOW_NODE_DURATION.observe(
+                span.latency_ms / 1000,
+                component_type=component_type,
+                status="error" if span.error else "success",
+            )
+
+    def finish(self, error: BaseException = None):
+        self.latency_ms = self._elapsed_ms()
+        if error is None:
+            self.status = "success"
+        elif isinstance(error, GeneratorExit) or type(error).__name__ == "CancelledError":
+            self.status = "cancelled"
+        else:
+            self.status = "error"
+            self.error = str(error)[:1024]
+
+    def totals(self) -> dict:
+        totals = dict.fromkeys(COUNTERS, 0)
+        for span in self.spans:
+            for name in COUNTERS:
+                totals[name] += span.details.get(name, 0)
+        return totals
+
+
+def trace_add(**counts):
+    """Add to numeric details of the current node's span (no-op when untraced)."""
+    span = _current_span.get()
+    if span is not None:
+        for name, value in counts.items():
+            span.details[name] = span.details.get(name, 0) + value
+
+
+def trace_annotate(**details):
+    """Set details on the current node's span (no-op when untraced)."""
+    span = _current_span.get()
+    if span is not None:
+        span.details.update(details)
+
+
+def traced_node(fn, node_id: str, component_type: str):
+    """Wrap an async node function so each execution is recorded as a span."""
+    takes_config = "config" in inspect.signature(fn).parameters
+
+    async def _node(state, config: RunnableConfig):
+        args = (state, config) if takes_config else (state,)
+        tracer = (config or {}).get("configurable", {}).get("tracer")
+        if tracer is None:
+            return await fn(*args)
+        async with tracer.span(node_id, component_type):
+            return await fn(*args)
+
+    _node.__name__ = getattr(fn, "__name__", type(fn).__name__)
+    return _node
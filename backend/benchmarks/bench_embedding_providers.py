@@ -0,0 +1,129 @@
+"""
+Embedding provider throughput benchmark: remote API vs local in-process model.
+
+The remote provider is the real OpenAIEmbeddings client pointed at a stand-in
+OpenAI-compatible /v1/embeddings server on localhost that adds a fixed
+latency per request (plus per input) and returns random vectors, so the
+numbers reflect round-trips and batching rather than OpenAI's own speed.
+The local provider runs LocalEmbeddings (ONNX all-MiniLM-L6-v2 by default).
+Caching is bypassed: every text is embedded.
+
+Usage (from backend/):
+    python benchmarks/bench_embedding_providers.py --texts 2000 --latency 0.15
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+from app.llm_models.local_embeddings import LocalEmbeddings
+
+
+def start_stand_in_server(dim: int, latency: float, per_input_latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            time.sleep(latency + per_input_latency * len(inputs))
+            vectors = np.random.default_rng().random((len(inputs), dim), dtype=np.float32)
+            payload = json.dumps(
+                {
+                    "object": "list",
+                    "model": body.get("model"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": v.tolist()}
+                        for i, v in enumerate(vectors)
+                    ],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_texts(count: int):
+    return [f"chunk {i} " + "lorem ipsum dolor sit amet " * 35 for i in range(count)]
+
+
+async def measure(embed, texts, concurrency: int, batch_size: int) -> float:
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(batch):
+        async with semaphore:
+            await embed(batch)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(b) for b in batches))
+    return len(texts) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--latency", type=float, default=0.15, help="stand-in server seconds per request")
+    parser.add_argument("--per-input-latency", type=float, default=0.0005)
+    parser.add_argument("--batch-sizes", default="1,64")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--local-threads", default="1,2,4")
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    server = start_stand_in_server(args.dim, args.latency, args.per_input_latency)
+    remote = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        api_key="bench",
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        check_embedding_ctx_length=False,
+        max_retries=0,
+    )
+
+    print(
+        f"{args.texts} texts, remote latency={args.latency}s/request, "
+        f"concurrency={args.concurrency}"
+    )
+    print(f"{'provider':>10} {'batch':>6} {'threads':>8} {'texts/sec':>12}")
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        rate = await measure(remote.aembed_documents, texts, args.concurrency, batch_size)
+        print(f"{'remote':>10} {batch_size:>6} {'-':>8} {rate:>12.1f}")
+
+    for threads in map(int, args.local_threads.split(",")):
+        local = LocalEmbeddings(threads=threads)
+        local.embed_query("load model")  # exclude model load from the timing
+        for batch_size in map(int, args.batch_sizes.split(",")):
+            local.batch_size = batch_size
+            rate = await measure(local.aembed_documents, texts, threads, batch_size)
+            print(f"{'local':>10} {batch_size:>6} {threads:>8} {rate:>12.1f}")
+
+    # Single query latency, the per-request cost of retrieval
+    for name, embed in (("remote", remote.aembed_query), ("local", local.aembed_query)):
+        start = time.perf_counter()
+        for text in texts[:20]:
+            await embed(text)
+        print(f"{name} query latency: {(time.perf_counter() - start) / 20 * 1000:.1f} ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+"""
+Graph save benchmark: full save vs delta save.
+
+Creates a workflow with an N-node chain graph, then repeatedly "drags one
+node and edits one node's config", saving it either with the full-graph
+PATCH path (save_workflow_graph) or the delta path
+(apply_workflow_graph_delta), and reports ms per save.
+
+Runs against a real database (PostgreSQL, as in production; the workflow
+it creates is deleted afterwards).
+
+Usage (from backend/):
+    python benchmarks/bench_graph_save.py --nodes 1000 --saves 20
+    python benchmarks/bench_graph_save.py --database-url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db.seed_components import seed_components
+from app.models.workflow import Workflow
+from app.models.workflow_node_config import WorkflowNodeConfig
+from app.schemas.workflow_graph import (
+    EdgeInput,
+    GraphInput,
+    NodeInput,
+    WorkflowGraphDeltaRequest,
+    WorkflowGraphSaveRequest,
+)
+from app.services.workflow_graph_service import (
+    apply_workflow_graph_delta,
+    save_workflow_graph,
+)
+from config import settings
+
+HANDLES = [
+    {"id": "in", "type": "target", "position": "left"},
+    {"id": "out", "type": "source", "position": "right"},
+]
+
+
+def make_node(i: int, x: float = None, temperature: float = 0.7) -> NodeInput:
+    return NodeInput(
+        id=f"node-{i}",
+        type="llm",
+        position={"x": x if x is not None else i * 250.0, "y": 100.0},
+        handles=HANDLES,
+        data={"config": {"model": "gpt-4o-mini", "temperature": temperature, "prompt": f"Step {i}"}},
+    )
+
+
+def make_graph(n: int) -> GraphInput:
+    nodes = [make_node(i) for i in range(n)]
+    edges = [EdgeInput(source=f"node-{i}", target=f"node-{i + 1}") for i in range(n - 1)]
+    return GraphInput(nodes=nodes, edges=edges)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--saves", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+
+    async with Session() as db:
+        await seed_components(db)
+        workflow = Workflow(name="bench-graph-save", flow_json={"nodes": [], "edges": []})
+        db.add(workflow)
+        await db.commit()
+        workflow_id = workflow.id
+
+    graph = make_graph(args.nodes)
+    async with Session() as db:
+        version = await save_workflow_graph(db, workflow_id, WorkflowGraphSaveRequest(graph=graph))
+
+    try:
+        # Full save: the whole graph is sent and rewritten every time
+        start = time.perf_counter()
+        for step in range(args.saves):
+            i = step % args.nodes
+            graph.nodes[i] = make_node(i, x=step * 10.0, temperature=0.1 + step / 100)
+            async with Session() as db:
+                version = await save_workflow_graph(
+                    db, workflow_id, WorkflowGraphSaveRequest(graph=graph, graph_version=version)
+                )
+        full_ms = (time.perf_counter() - start) / args.saves * 1000
+
+        # Delta save: one moved node (flow_json only) + one config edit (one row)
+        start = time.perf_counter()
+        for step in range(args.saves):
+            i = step % args.nodes
+            delta = WorkflowGraphDeltaRequest(
+                base_version=version,
+                upsert_nodes=[
+                    make_node(i, x=step * 20.0),
+                    make_node((i + 1) % args.nodes, temperature=0.5 + step / 100),
+                ],
+            )
+            async with Session() as db:
+                version = await apply_workflow_graph_delta(db, workflow_id, delta)
+        delta_ms = (time.perf_counter() - start) / args.saves * 1000
+    finally:
+        async with Session() as db:
+            await db.execute(
+                WorkflowNodeConfig.__table__.delete().where(
+                    WorkflowNodeConfig.workflow_id == workflow_id
+                )
+            )
+            await db.execute(Workflow.__table__.delete().where(Workflow.id == workflow_id))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"{args.nodes} nodes, {args.saves} saves each")
+    print(f"{'full save':>12}: {full_ms:8.1f} ms/save")
+    print(f"{'delta save':>12}: {delta_ms:8.1f} ms/save  ({full_ms / delta_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Ingestion embedding throughput benchmark.
+
+Runs embed_and_upsert against a local fake embedding model (fixed latency
+per request + per chunk, optional rate limiting) and an in-memory Chroma
+collection, and reports chunks/sec for a grid of batch sizes / concurrency.
+
+Usage (from backend/):
+    python benchmarks/bench_ingest_embedding.py --chunks 5000
+"""
+import argparse
+import asyncio
+import hashlib
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import chromadb
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.services.document_ingest_service import embed_and_upsert
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeRemoteEmbeddings(Embeddings):
+    """Deterministic vectors with simulated request latency and rate limits."""
+
+    def __init__(self, dim: int, request_latency: float, per_chunk_latency: float, rate_limit_every: int):
+        self.dim = dim
+        self.request_latency = request_latency
+        self.per_chunk_latency = per_chunk_latency
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        return np.random.default_rng(seed).random(self.dim, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+            raise RateLimitError("rate limited")
+        await asyncio.sleep(self.request_latency + self.per_chunk_latency * len(texts))
+        return self.embed_documents(texts)
+
+
+def make_chunks(count: int) -> List[Document]:
+    return [
+        Document(
+            page_content=f"chunk {i} " + "lorem ipsum dolor sit amet " * 35,
+            metadata={"file_id": 1, "filename": "bench.pdf", "page": i // 4},
+        )
+        for i in range(count)
+    ]
+
+
+async def run_case(chunks, batch_size, concurrency, args) -> float:
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"bench_{batch_size}_{concurrency}")
+    embeddings = FakeRemoteEmbeddings(
+        args.dim, args.request_latency, args.per_chunk_latency, args.rate_limit_every
+    )
+    start = time.perf_counter()
+    written = await embed_and_upsert(
+        chunks, embeddings, collection, batch_size=batch_size, concurrency=concurrency
+    )
+    elapsed = time.perf_counter() - start
+    client.delete_collection(collection.name)
+    return written / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--request-latency", type=float, default=0.15)
+    parser.add_argument("--per-chunk-latency", type=float, default=0.0005)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="fail every Nth request with 429")
+    parser.add_argument("--batch-sizes", default="1,16,64,256")
+    parser.add_argument("--concurrency", default="1,4,8")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    print(f"{args.chunks} chunks, dim={args.dim}, request latency={args.request_latency}s")
+    print(f"{'batch':>6} {'concurrency':>12} {'chunks/sec':>12}")
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        for concurrency in map(int, args.concurrency.split(",")):
+            rate = await run_case(chunks, batch_size, concurrency, args)
+            print(f"{batch_size:>6} {concurrency:>12} {rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,182 @@
+"""
+Response serialization micro-benchmark.
+
+Times what happens after an endpoint returns, for a representative graph
+payload (GET /workflow-graph/{id}/graph, full format) and a run detail
+(GET /workflows/{id}/runs/{run_id}):
+
+  before: response model with free-form Dict[str, Any] fields, validated,
+          dumped to python, then rendered by Starlette's stdlib JSONResponse
+  after:  graph: the service's dict rendered by ORJSONResponse directly (the
+          endpoint skips response-model validation);
+          run detail: typed response model (pydantic-core serializer),
+          rendered by ORJSONResponse
+
+plus the typed graph model and stdlib json.dumps for reference.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py --nodes 500 --repeat 200
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.responses import ORJSONResponse
+from app.schemas.workflow_graph import WorkflowGraphResponse
+from app.schemas.workflow_run import WorkflowRunDetail, WorkflowRunSummary
+from app.workflow.components_registry import COMPONENT_DEFINITIONS
+
+
+# --- Response models as they were before typing ---
+class UntypedGraphResponse(BaseModel):
+    workflow: Dict[str, Any]
+    graph: Dict[str, Any]
+
+
+class UntypedRunDetail(WorkflowRunSummary):
+    spans: List[Dict[str, Any]] = []
+
+
+def make_graph_payload(n: int) -> dict:
+    components = [
+        {k: c[k] for k in ("type", "name", "description", "ui_schema")}
+        for c in COMPONENT_DEFINITIONS
+    ]
+    nodes = []
+    for i in range(n):
+        definition = COMPONENT_DEFINITIONS[i % len(COMPONENT_DEFINITIONS)]
+        nodes.append(
+            {
+                "id": f"node-{i}",
+                "type": definition["type"],
+                "position": {"x": i * 250.0, "y": (i % 7) * 120.0},
+                "handles": definition.get("handles", []),
+                "config": {"model": "gpt-4o-mini", "temperature": 0.7, "prompt": f"Step {i}: answer briefly"},
+                "component": components[i % len(components)],
+            }
+        )
+    edges = [
+        {
+            "source": f"node-{i}",
+            "target": f"node-{i + 1}",
+            "sourceHandle": "right-source",
+            "targetHandle": "left-target",
+        }
+        for i in range(n - 1)
+    ]
+    return {
+        "workflow": {"id": 1, "name": "bench", "description": None, "graph_version": 42},
+        "graph": {"nodes": nodes, "edges": edges},
+    }
+
+
+def make_run_payload(n: int) -> dict:
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    spans = [
+        {
+            "node_id": f"node-{i}",
+            "component_type": "llm",
+            "offset_ms": i * 12.5,
+            "started_at": (start + timedelta(milliseconds=i * 12.5)).isoformat(),
+            "ended_at": (start + timedelta(milliseconds=i * 12.5 + 10)).isoformat(),
+            "latency_ms": 10.0,
+            "error": None,
+            "details": {"llm_prompt_tokens": 120, "llm_completion_tokens": 48, "model": "gpt-4o-mini"},
+        }
+        for i in range(n)
+    ]
+    return {
+        "id": "0" * 32,
+        "workflow_id": 1,
+        "mode": "run",
+        "status": "success",
+        "input_query": "What does the report say about Q3 revenue?",
+        "started_at": start,
+        "latency_ms": n * 12.5,
+        "llm_prompt_tokens": 120 * n,
+        "llm_completion_tokens": 48 * n,
+        "spans": spans,
+    }
+
+
+def stdlib_render(content) -> bytes:
+    # starlette.responses.JSONResponse.render
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def through_model(adapter: TypeAdapter, render, payload, **dump_kwargs):
+    # FastAPI's serialize_response: validate, dump to JSON-able python, render
+    value = adapter.validate_python(payload)
+    return render(adapter.dump_python(value, mode="json", **dump_kwargs))
+
+
+def bench(fn, repeat: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def report(title: str, cases: dict, repeat: int):
+    print(title)
+    baseline = None
+    for name, fn in cases.items():
+        ms = bench(fn, repeat)
+        baseline = baseline or ms
+        print(f"  {name:<32} {ms:8.3f} ms   {baseline / ms:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--spans", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    orjson_render = ORJSONResponse(None).render
+    graph = make_graph_payload(args.nodes)
+    run = make_run_payload(args.spans)
+    graph_plain = json.loads(json.dumps(graph))
+    size = len(orjson.dumps(graph_plain))
+
+    untyped_graph = TypeAdapter(UntypedGraphResponse)
+    typed_graph = TypeAdapter(WorkflowGraphResponse)
+    report(
+        f"Graph: {args.nodes} nodes, {size / 1024:.0f} KiB",
+        {
+            "before (untyped + stdlib json)": lambda: through_model(untyped_graph, stdlib_render, graph),
+            "after (ORJSONResponse, no model)": lambda: orjson_render(graph),
+            "typed model + orjson": lambda: through_model(
+                typed_graph, orjson_render, graph, exclude_unset=True
+            ),
+            "raw json.dumps": lambda: stdlib_render(graph_plain),
+        },
+        args.repeat,
+    )
+
+    untyped_run = TypeAdapter(UntypedRunDetail)
+    typed_run = TypeAdapter(WorkflowRunDetail)
+    report(
+        f"Run detail: {args.spans} spans",
+        {
+            "before (untyped + stdlib json)": lambda: through_model(untyped_run, stdlib_render, run),
+            "after (typed + orjson)": lambda: through_model(typed_run, orjson_render, run),
+        },
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
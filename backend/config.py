@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,12 +17,27 @@ class Settings:
         self.PROJECT_BASE_DIR: Path = Path(os.getenv("PROJECT_BASE_DIR", "."))
         self.DATABASE_URL: str = os.getenv("DATABASE_URL", "")
 
+        # Logging: level, output format ("json" | "text"), and SQL statement logging
+        self.LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+        self.LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+        self.DB_ECHO: bool = os.getenv("DB_ECHO", "False").lower() == "true"
+
         # User files directory
         self.USER_FILES_DIR: Path = self.PROJECT_BASE_DIR / "user_files"
+        # Uploads: max size (bytes, enforced while streaming) and copy chunk size
+        self.UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+        self.UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+        # Max request body (bytes), refused while receiving; upload limit plus multipart overhead
+        self.REQUEST_MAX_BYTES: int = int(
+            os.getenv("REQUEST_MAX_BYTES", str(self.UPLOAD_MAX_BYTES + 1024 * 1024))
+        )
 
         # Vector database directory
         self.CHROMA_DB_PATH: Path = self.PROJECT_BASE_DIR / "chroma_db"
 
+        # BM25 keyword indexes (one JSON file per collection), next to chroma_db
+        self.KEYWORD_INDEX_PATH: Path = self.PROJECT_BASE_DIR / "keyword_index"
+
         self.LLM_MODEL_NAME: str = os.getenv("LLM_MODEL_NAME", "gpt-4o")
         self.TIKTOKEN_MODEL_NAME: str = os.getenv("TIKTOKEN_MODEL_NAME", "gpt-4o")
         self.EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-3-small")
@@ -33,8 +48,75 @@ class Settings:
         )
         self.TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
 
+        # Chat model provider ("openai" | "fake"); "fake" streams a canned answer
+        self.LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")
+        self.FAKE_LLM_RESPONSE: str = os.getenv(
+            "FAKE_LLM_RESPONSE", "This is a streamed answer from the fake chat model."
+        )
+        self.FAKE_LLM_TOKEN_DELAY: float = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.01"))
+
         self.HUGGINGFACE_API_KEY: str = os.getenv("HUGGINGFACE_API_KEY", "")
 
+        # Default embedding provider for ingestion and retrieval
+        # ("openai" | "huggingface" | "local"); workflows may override it
+        self.EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openai")
+
+        # "local" provider: in-process CPU model, texts per inference batch, threads
+        self.LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.LOCAL_EMBEDDING_BATCH_SIZE: int = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+        self.LOCAL_EMBEDDING_THREADS: int = int(os.getenv("LOCAL_EMBEDDING_THREADS", "2"))
+
+        # Query/chunk embedding cache: in-memory LRU size, optional SQLite file
+        self.EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+        embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", "")
+        self.EMBEDDING_CACHE_PATH: Optional[Path] = (
+            Path(embedding_cache_path) if embedding_cache_path else None
+        )
+
+        # Threads available to synchronous workflow nodes
+        self.NODE_THREAD_POOL_SIZE: int = int(os.getenv("NODE_THREAD_POOL_SIZE", "16"))
+        # Max workflow runs executing concurrently per worker process
+        self.MAX_CONCURRENT_RUNS: int = int(os.getenv("MAX_CONCURRENT_RUNS", "64"))
+
+        # Default / max concurrency for /workflows/run/batch
+        self.BATCH_RUN_CONCURRENCY: int = int(os.getenv("BATCH_RUN_CONCURRENCY", "8"))
+        self.BATCH_RUN_MAX_CONCURRENCY: int = int(os.getenv("BATCH_RUN_MAX_CONCURRENCY", "32"))
+        # Queries per embedding request when a batch run pre-embeds its messages
+        self.BATCH_RUN_EMBED_BATCH_SIZE: int = int(os.getenv("BATCH_RUN_EMBED_BATCH_SIZE", "64"))
+
+        # Background ingestion: concurrent jobs, and threads for PDF parsing
+        self.INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+        self.INGEST_PARSE_THREADS: int = int(os.getenv("INGEST_PARSE_THREADS", "4"))
+        # Running jobs refresh a heartbeat; one silent for INGEST_STALE_SECONDS
+        # (its worker died) is re-queued for any worker to claim
+        self.INGEST_HEARTBEAT_SECONDS: float = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "15"))
+        self.INGEST_STALE_SECONDS: float = float(os.getenv("INGEST_STALE_SECONDS", "120"))
+        # Chunks per embedding request, in-flight requests, and 429 retry policy
+        self.INGEST_EMBED_BATCH_SIZE: int = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+        self.INGEST_EMBED_CONCURRENCY: int = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+        self.INGEST_EMBED_MAX_RETRIES: int = int(os.getenv("INGEST_EMBED_MAX_RETRIES", "5"))
+        self.INGEST_EMBED_BACKOFF_SECONDS: float = float(os.getenv("INGEST_EMBED_BACKOFF_SECONDS", "1.0"))
+
+        # Max number of compiled workflow graphs kept in memory
+        self.GRAPH_CACHE_SIZE: int = int(os.getenv("GRAPH_CACHE_SIZE", "128"))
+
+        # Response compression: smallest body worth compressing, gzip level,
+        # brotli quality (brotli only if the package is installed)
+        self.COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        self.GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+        self.BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
+        # LLM response cache ("memory" | "sqlite" | "none")
+        self.RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+        self.RESPONSE_CACHE_PATH: Path = Path(
+            os.getenv("RESPONSE_CACHE_PATH", str(self.PROJECT_BASE_DIR / "cache" / "responses.sqlite3"))
+        )
+        self.RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+        self.RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+        # Semantic tier: reuse answers for near-identical questions (cosine distance)
+        self.RESPONSE_CACHE_SEMANTIC: bool = os.getenv("RESPONSE_CACHE_SEMANTIC", "False").lower() == "true"
+        self.RESPONSE_CACHE_MAX_DISTANCE: float = float(os.getenv("RESPONSE_CACHE_MAX_DISTANCE", "0.05"))
+
         # Parse CORS origins from comma-separated string
         cors_origins_str = os.getenv(
             "CORS_ORIGINS", "http://localhost:3000,http://localhost:5173"
@@ -1,22 +1,39 @@
 import uvicorn
 import os
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
 # Adjust these imports based on the folder structure I gave you
 from app import models
 from app.db.session import engine, SessionLocal
 
 from app.db.seed_components import seed_components
+from app.services.component_catalog import component_catalog
+from app.llm_models.vector_store import RetrievalResources
+from app.llm_models.response_cache import response_cache
+from app.workflow.executor import shutdown_node_executor
+from app.services.ingestion_queue import IngestionQueue
+from app.services.document_ingest_service import shutdown_parse_executor
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.limits import RequestSizeLimitMiddleware
+from app.core.responses import ORJSONResponse
+from app.core.logging import setup_logging
 # Assuming you put your router in app/api/v1/router.py
 from app.api.v1.router import api_router 
 from config import settings
 
+# Queue-based logging (JSON by default), before anything logs
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # ✅ LIFESPAN: The correct way to handle async startup tasks
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("🚀 Starting up Workflow Builder...")
+    logger.info("Starting up Workflow Builder")
     
     # Create DB tables (Async compatible)
     async with engine.begin() as conn:
@@ -26,20 +43,43 @@ async def lifespan(app: FastAPI):
 
     async with SessionLocal() as session:
         await seed_components(session)
+        # Component reads are served from memory from here on
+        await component_catalog.load(session)
+
+    # Shared vector store / embedding clients, reused by every workflow run
+    app.state.retrieval = RetrievalResources()
+
+    # Background ingestion workers (re-queues jobs interrupted by a restart)
+    app.state.ingestion_queue = IngestionQueue(app.state.retrieval)
+    await app.state.ingestion_queue.start()
+
+    # Gauges read at scrape time
+    metrics.INGESTION_QUEUE_DEPTH.set_function(app.state.ingestion_queue.depth)
+    metrics.bind_db_pool(engine.pool)
     
     yield
     
-    print("🛑 Shutting down...")
-    # Add cleanup logic here if needed (e.g., closing connections)
+    logger.info("Shutting down")
+    await app.state.ingestion_queue.stop()
+    shutdown_parse_executor()
+    await app.state.retrieval.close()
+    if response_cache is not None:
+        # Writes buffered last-access times (SQLite backend)
+        response_cache.close()
+    shutdown_node_executor()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Low-Code/No-Code Workflow Engine with RAG & LLM integration",
     version="1.0.0",
     lifespan=lifespan, # Register the lifespan handler
+    default_response_class=ORJSONResponse,
     # debug=settings.debug # Note: 'debug' param is deprecated in newer FastAPI versions
 )
 
+# Oversized bodies get 413 before being spooled (inside CORS so browsers can read it)
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=settings.REQUEST_MAX_BYTES)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -49,6 +89,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli; streamed responses are flushed per chunk
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
+# Per-route request latency for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(api_router, prefix="/api/v1")
 
@@ -64,6 +115,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     # Ensure settings.API_PORT / API_HOST exist in your config.py
     # or default to standard values
@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("numpy")
+Embeddings = pytest.importorskip("langchain_core.embeddings").Embeddings
+
+from app.llm_models.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic provider that records every text it is asked to embed."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _vector(self, text):
+        return [float(len(text)), 1.0, 0.5]
+
+    def embed_documents(self, texts):
+        self.calls.extend(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_aembed_query_miss_then_hit(tmp_path, persistent):
+    underlying = CountingEmbeddings()
+    cache = EmbeddingCache(
+        max_entries=10, path=tmp_path / "embeddings.sqlite" if persistent else None
+    )
+    embeddings = CachedEmbeddings(underlying, "test/model", cache)
+
+    miss = asyncio.run(embeddings.aembed_query("what is revenue?"))
+    hit = asyncio.run(embeddings.aembed_query("what  is revenue?"))
+
+    assert miss == [16.0, 1.0, 0.5]
+    assert hit == miss
+    assert underlying.calls == ["what is revenue?"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_aembed_documents_only_sends_misses(tmp_path):
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, "test/model", EmbeddingCache(max_entries=10))
+
+    asyncio.run(embeddings.aembed_query("a"))
+    vectors = asyncio.run(embeddings.aembed_documents(["a", "bb", "bb"]))
+
+    assert vectors == [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5], [2.0, 1.0, 0.5]]
+    assert underlying.calls == ["a", "bb"]